@@ -16,11 +16,20 @@ def create_app(config_name=None):
     )
     
     db.init_app(app)
-    migrate.init_app(app, db)
+    from app.utils.schema import include_object
+    # Search tables/columns/indexes are installed at startup, not migrated
+    migrate.init_app(app, db, include_object=include_object)
     csrf.init_app(app)
     mail.init_app(app)
     login_manager.init_app(app)
 
+    from app.utils.storage import init_storage
+    from app.utils.view_counter import init_view_counter
+    from app.utils.activity_log import init_activity_log
+    init_storage(app)
+    init_view_counter(app)
+    init_activity_log(app)
+
     setup_logging(app)
     register_blueprints(app)
     register_error_handlers(app)
@@ -38,9 +47,32 @@ def create_app(config_name=None):
         from app import models
         db.create_all()
 
-    from app.cli import init_users, init_sample_data
+    from app.utils.search import init_search
+    from app.utils.fuzzy import init_fuzzy_search
+    from app.utils.typeahead import init_typeahead
+    from app.utils.facets import init_facets
+    from app.utils.search_cache import init_search_cache
+    from app.utils.stats import init_stats
+    from app.utils.page_cache import init_page_cache
+    from app.utils.static_pages import init_static_pages
+    from app.utils.report_priority import init_report_priority
+    init_search(app)
+    init_fuzzy_search(app)
+    init_typeahead(app)
+    init_facets(app)
+    init_search_cache(app)
+    init_stats(app)
+    init_page_cache(app)
+    init_static_pages(app)
+    init_report_priority(app)
+
+    from app.cli import init_users, init_sample_data, uploads, cases, activity, exports
     init_users.init_app(app)
     init_sample_data.init_app(app)
+    uploads.init_app(app)
+    cases.init_app(app)
+    activity.init_app(app)
+    exports.init_app(app)
 
     return app
 from app import models
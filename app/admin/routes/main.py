@@ -1,8 +1,8 @@
-from flask import render_template, request, redirect, url_for, flash, jsonify, abort
+from flask import render_template, request, redirect, url_for, flash, jsonify, abort, current_app, stream_with_context
 from flask_login import login_required, current_user
 from functools import wraps
-from datetime import datetime, timedelta
-from sqlalchemy import func, or_, and_
+from datetime import date, datetime, timedelta
+from sqlalchemy import func, insert
 from app.admin import bp as admin_bp
 from app.extensions import db
 from app.models.user import User
@@ -10,6 +10,16 @@ from app.models.missing_person import MissingPerson, PersonPhoto
 from app.models.sighting import SightingReport, SightingPhoto
 from app.models.audit import Notification, ActivityLog, Message, SystemSetting
 from app.models.options import UserRole, MissingPersonStatus, ReportStatus
+from app.models.loaders import view_options
+from app.utils.search import apply_search
+from app.utils.keyset import paginate_keyset
+from app.utils.stats import site_stats
+from app.utils.result_cache import ResultCache
+from app.utils.activity_log import get_activity_log
+from app.utils.report_priority import get_report_priority
+from app.utils.user_search import user_search_filter
+from app.utils.exports import stream_export, export_filename
+from app.utils.rollups import METRICS as ROLLUP_METRICS, GRANULARITIES, MAX_BUCKETS, bucket_count, series
 
 
 def admin_required(f):
@@ -22,32 +32,31 @@ def admin_required(f):
 
 
 def log_activity(action, entity_type=None, entity_id=None, description=None):
-    try:
-        log = ActivityLog(
-            user_id=current_user.id if current_user.is_authenticated else None,
-            action=action,
-            entity_type=entity_type,
-            entity_id=entity_id,
-            description=description,
-            ip_address=request.remote_addr,
-            user_agent=request.headers.get('User-Agent')
-        )
-        db.session.add(log)
-        db.session.commit()
-    except Exception as e:
-        print(f"Error logging activity: {e}")
+    """Queue an activity log entry; written in batches in the background"""
+    get_activity_log().record(
+        action,
+        user_id=current_user.id if current_user.is_authenticated else None,
+        entity_type=entity_type,
+        entity_id=entity_id,
+        description=description,
+        ip_address=request.remote_addr,
+        user_agent=request.headers.get('User-Agent')
+    )
 
 
 @admin_bp.route('/')
 @admin_required
 def dashboard():
     try:
-        total_users = User.query.count()
-        total_missing = MissingPerson.query.filter_by(status=MissingPersonStatus.MISSING).count()
-        total_found = MissingPerson.query.filter_by(status=MissingPersonStatus.FOUND).count()
-        pending_reports = SightingReport.query.filter_by(status=ReportStatus.PENDING).count()
-
-        recent_reports = SightingReport.query.order_by(SightingReport.created_at.desc()).limit(10).all()
+        counts = site_stats()
+        total_users = counts['users']
+        total_missing = counts['cases.missing']
+        total_found = counts['cases.found']
+        pending_reports = counts['reports.pending']
+
+        recent_reports = SightingReport.query.options(*view_options('admin_dashboard_reports')).order_by(
+            SightingReport.created_at.desc()
+        ).limit(10).all()
         recent_missing = MissingPerson.query.order_by(MissingPerson.created_at.desc()).limit(5).all()
 
         thirty_days_ago = datetime.now() - timedelta(days=30)
@@ -74,26 +83,22 @@ def dashboard():
 @admin_bp.route('/users')
 @admin_required
 def users():
-    page = request.args.get('page', 1, type=int)
     search = request.args.get('search', '')
     role_filter = request.args.get('role', '')
 
     query = User.query
 
-    if search:
-        query = query.filter(
-            or_(
-                User.username.ilike(f'%{search}%'),
-                User.email.ilike(f'%{search}%'),
-                User.full_name.ilike(f'%{search}%')
-            )
-        )
+    condition = user_search_filter(search)
+    if condition is not None:
+        query = query.filter(condition)
 
     if role_filter:
         query = query.filter_by(role=UserRole[role_filter.upper()])
 
-    users_pagination = query.order_by(User.created_at.desc()).paginate(
-        page=page, per_page=20, error_out=False
+    users_pagination = paginate_keyset(
+        query, User.created_at, User.id,
+        after=request.args.get('after'), before=request.args.get('before'),
+        per_page=20, count=request.args.get('count', type=int) == 1
     )
 
     log_activity('VIEW_USERS', description='Viewed users list')
@@ -104,9 +109,9 @@ def users():
 @admin_bp.route('/users/<int:user_id>')
 @admin_required
 def user_detail(user_id):
-    user = User.query.get_or_404(user_id)
-    missing_persons = user.missing_persons.all()
-    sighting_reports = user.sighting_reports.all()
+    user = User.query.options(*view_options('admin_user_detail')).get_or_404(user_id)
+    missing_persons = user.missing_person_list
+    sighting_reports = user.sighting_report_list
 
     log_activity('VIEW_USER', entity_type='User', entity_id=user_id)
 
@@ -160,7 +165,6 @@ def change_user_role(user_id):
 @admin_bp.route('/missing-persons')
 @admin_required
 def missing_persons():
-    page = request.args.get('page', 1, type=int)
     search = request.args.get('search', '')
     status_filter = request.args.get('status', '')
     verified_filter = request.args.get('verified', '')
@@ -168,12 +172,7 @@ def missing_persons():
     query = MissingPerson.query
 
     if search:
-        query = query.filter(
-            or_(
-                MissingPerson.full_name.ilike(f'%{search}%'),
-                MissingPerson.case_number.ilike(f'%{search}%')
-            )
-        )
+        query = apply_search(query, search, ranked=False)
 
     if status_filter:
         query = query.filter_by(status=MissingPersonStatus[status_filter.upper()])
@@ -182,8 +181,10 @@ def missing_persons():
         is_verified = verified_filter.lower() == 'true'
         query = query.filter_by(is_verified=is_verified)
 
-    persons_pagination = query.order_by(MissingPerson.created_at.desc()).paginate(
-        page=page, per_page=20, error_out=False
+    persons_pagination = paginate_keyset(
+        query, MissingPerson.created_at, MissingPerson.id,
+        after=request.args.get('after'), before=request.args.get('before'),
+        per_page=20, count=request.args.get('count', type=int) == 1
     )
 
     log_activity('VIEW_MISSING_PERSONS', description='Viewed missing persons list')
@@ -261,19 +262,87 @@ def update_person_status(person_id):
         return jsonify({'success': False, 'message': 'Invalid status'}), 400
 
 
+@admin_bp.route('/missing-persons/bulk', methods=['POST'])
+@admin_required
+def bulk_update_missing_persons():
+    """
+    Verify cases or set their status in one transaction:
+    {"action": "verify", "ids": [...]} or
+    {"action": "status", "status": "found", "ids": [...]}.
+    Returns a result per id.
+    """
+    data = request.get_json(silent=True) or {}
+    action = data.get('action')
+    if action == 'status':
+        try:
+            status = MissingPersonStatus[str(data.get('status', '')).upper()]
+        except KeyError:
+            return jsonify({'success': False, 'message': 'Invalid status'}), 400
+    elif action != 'verify':
+        return jsonify({'success': False, 'message': 'action must be verify or status'}), 400
+    ids, error = _bulk_ids()
+    if error:
+        return error
+
+    persons = {person.id: person for person in MissingPerson.query.filter(MissingPerson.id.in_(ids))}
+    results, notifications, updated = [], [], []
+    for person_id in ids:
+        person = persons.get(person_id)
+        if person is None:
+            results.append({'id': person_id, 'success': False, 'message': 'Person not found'})
+            continue
+
+        if action == 'verify':
+            if person.is_verified:
+                results.append({'id': person_id, 'success': False, 'message': 'Already verified'})
+                continue
+            person.is_verified = True
+            message = 'Person verified'
+            notification = {'title': 'Report Verified', 'notification_type': 'verification',
+                            'message': f'Your missing person report for {person.full_name} has been verified.'}
+        else:
+            if person.status == status:
+                results.append({'id': person_id, 'success': False, 'message': f'Already {status.value}'})
+                continue
+            # found_date / closed_at are stamped on flush
+            person.status = status
+            message = f'Status updated to {status.value}'
+            notification = {'title': 'Status Updated', 'notification_type': 'status_update',
+                            'message': f'The status of {person.full_name} has been updated to {status.value}.'}
+
+        if person.reported_by is not None:
+            notifications.append(dict(notification, user_id=person.reported_by, related_person_id=person_id))
+        updated.append(person_id)
+        results.append({'id': person_id, 'success': True, 'message': message})
+
+    _notify(notifications)
+    db.session.commit()
+
+    for person_id in updated:
+        if action == 'verify':
+            log_activity('VERIFY_MISSING_PERSON', entity_type='MissingPerson', entity_id=person_id,
+                         description='Bulk moderation')
+        else:
+            log_activity('UPDATE_PERSON_STATUS', entity_type='MissingPerson', entity_id=person_id,
+                         description=f'Changed status to {status.value} (bulk)')
+
+    return jsonify({'success': True, 'updated': len(updated), 'results': results})
+
+
 @admin_bp.route('/reports')
 @admin_required
 def reports():
-    page = request.args.get('page', 1, type=int)
     status_filter = request.args.get('status', '')
 
-    query = SightingReport.query
+    query = SightingReport.query.options(*view_options('admin_reports'))
 
     if status_filter:
         query = query.filter_by(status=ReportStatus[status_filter.upper()])
 
-    reports_pagination = query.order_by(SightingReport.created_at.desc()).paginate(
-        page=page, per_page=20, error_out=False
+    reports_pagination = paginate_keyset(
+        query, SightingReport.created_at, SightingReport.id,
+        after=request.args.get('after'), before=request.args.get('before'),
+        per_page=20, count=request.args.get('count', type=int) == 1
     )
 
     log_activity('VIEW_REPORTS', description='Viewed sighting reports list')
@@ -283,6 +352,23 @@ def reports():
                          status_filter=status_filter)
 
 
+@admin_bp.route('/reports/queue')
+@admin_required
+def report_queue():
+    """Pending reports, highest priority first"""
+    reports_pagination = get_report_priority().queue(
+        after=request.args.get('after'), before=request.args.get('before'),
+        per_page=20, count=request.args.get('count', type=int) == 1
+    )
+
+    log_activity('VIEW_REPORT_QUEUE', description='Viewed moderation queue')
+
+    return render_template('admin/reports.html',
+                         reports=reports_pagination,
+                         status_filter='pending',
+                         queue=True)
+
+
 @admin_bp.route('/reports/<int:report_id>')
 @admin_required
 def report_detail(report_id):
@@ -294,26 +380,58 @@ def report_detail(report_id):
     return render_template('admin/report_detail.html', report=report, photos=photos)
 
 
+# action -> (status, activity log action, notification title, notification message)
+REPORT_DECISIONS = {
+    'verify': (ReportStatus.VERIFIED, 'VERIFY_REPORT', 'Sighting Report Verified',
+               'Your sighting report has been verified by our team.'),
+    'reject': (ReportStatus.REJECTED, 'REJECT_REPORT', 'Sighting Report Reviewed',
+               'Your sighting report has been reviewed.'),
+}
+
+
+def _review_report(report, action, notes):
+    """Apply a moderation decision without committing; returns the notification row, if any"""
+    status, _, title, message = REPORT_DECISIONS[action]
+    report.review(status, current_user.id, notes)
+    if report.reported_by is None:
+        return None
+    return {'user_id': report.reported_by, 'title': title, 'message': message,
+            'notification_type': 'verification', 'related_report_id': report.id}
+
+
+def _notify(rows):
+    """Insert notification rows in one statement, in the current transaction"""
+    rows = [row for row in rows if row is not None]
+    if rows:
+        db.session.execute(insert(Notification.__table__), rows)
+
+
+def _bulk_ids():
+    """Unique integer ids from the JSON body, or an error response"""
+    ids = (request.get_json(silent=True) or {}).get('ids')
+    if not isinstance(ids, list) or not ids:
+        return None, (jsonify({'success': False, 'message': 'ids must be a non-empty list'}), 400)
+    # Only JSON integers that fit a BIGINT; int() would truncate 1.9 and accept "3" or true
+    if not all(type(ident) is int and -2**63 <= ident < 2**63 for ident in ids):
+        return None, (jsonify({'success': False, 'message': 'ids must be integers'}), 400)
+    ids = list(dict.fromkeys(ids))
+    limit = current_app.config.get('BULK_MODERATION_MAX_ITEMS', 500)
+    if len(ids) > limit:
+        return None, (jsonify({'success': False, 'message': f'At most {limit} items per request'}), 400)
+    return ids, None
+
+
 @admin_bp.route('/reports/<int:report_id>/verify', methods=['POST'])
 @admin_required
 def verify_report(report_id):
     report = SightingReport.query.get_or_404(report_id)
     notes = request.json.get('notes', '')
 
-    report.verify_report(current_user.id, notes)
+    _notify([_review_report(report, 'verify', notes)])
+    db.session.commit()
 
     log_activity('VERIFY_REPORT', entity_type='SightingReport', entity_id=report_id)
 
-    notification = Notification(
-        user_id=report.reported_by,
-        title='Sighting Report Verified',
-        message=f'Your sighting report has been verified by our team.',
-        notification_type='verification',
-        related_report_id=report_id
-    )
-    db.session.add(notification)
-    db.session.commit()
-
     return jsonify({'success': True, 'message': 'Report verified successfully'})
 
 
@@ -323,27 +441,57 @@ def reject_report(report_id):
     report = SightingReport.query.get_or_404(report_id)
     notes = request.json.get('notes', '')
 
-    report.reject_report(current_user.id, notes)
+    _notify([_review_report(report, 'reject', notes)])
+    db.session.commit()
 
     log_activity('REJECT_REPORT', entity_type='SightingReport', entity_id=report_id)
 
-    notification = Notification(
-        user_id=report.reported_by,
-        title='Sighting Report Reviewed',
-        message=f'Your sighting report has been reviewed.',
-        notification_type='verification',
-        related_report_id=report_id
-    )
-    db.session.add(notification)
+    return jsonify({'success': True, 'message': 'Report rejected'})
+
+
+@admin_bp.route('/reports/bulk', methods=['POST'])
+@admin_required
+def bulk_review_reports():
+    """
+    Verify or reject many reports in one transaction:
+    {"action": "verify" | "reject", "ids": [...], "notes": "..."}.
+    Returns a result per id.
+    """
+    data = request.get_json(silent=True) or {}
+    action = data.get('action')
+    if action not in REPORT_DECISIONS:
+        return jsonify({'success': False, 'message': 'action must be verify or reject'}), 400
+    ids, error = _bulk_ids()
+    if error:
+        return error
+
+    status, log_action = REPORT_DECISIONS[action][:2]
+    reports = {report.id: report for report in SightingReport.query.filter(SightingReport.id.in_(ids))}
+    results, notifications, reviewed = [], [], []
+    for report_id in ids:
+        report = reports.get(report_id)
+        if report is None:
+            results.append({'id': report_id, 'success': False, 'message': 'Report not found'})
+        elif report.status == status:
+            results.append({'id': report_id, 'success': False, 'message': f'Already {status.value}'})
+        else:
+            notifications.append(_review_report(report, action, data.get('notes', '')))
+            reviewed.append(report_id)
+            results.append({'id': report_id, 'success': True, 'message': f'Report {status.value}'})
+
+    _notify(notifications)
     db.session.commit()
 
-    return jsonify({'success': True, 'message': 'Report rejected'})
+    for report_id in reviewed:
+        log_activity(log_action, entity_type='SightingReport', entity_id=report_id,
+                     description='Bulk moderation')
+
+    return jsonify({'success': True, 'updated': len(reviewed), 'results': results})
 
 
 @admin_bp.route('/activity-logs')
 @admin_required
 def activity_logs():
-    page = request.args.get('page', 1, type=int)
     action_filter = request.args.get('action', '')
 
     query = ActivityLog.query
@@ -351,8 +499,10 @@ def activity_logs():
     if action_filter:
         query = query.filter(ActivityLog.action.ilike(f'%{action_filter}%'))
 
-    logs_pagination = query.order_by(ActivityLog.created_at.desc()).paginate(
-        page=page, per_page=50, error_out=False
+    logs_pagination = paginate_keyset(
+        query, ActivityLog.created_at, ActivityLog.id,
+        after=request.args.get('after'), before=request.args.get('before'),
+        per_page=50, count=request.args.get('count', type=int) == 1
     )
 
     log_activity('VIEW_ACTIVITY_LOGS', description='Viewed activity logs')
@@ -362,6 +512,31 @@ def activity_logs():
                          action_filter=action_filter)
 
 
+@admin_bp.route('/export/<kind>')
+@admin_required
+def export(kind):
+    """
+    Stream cases, reports or activity logs as ?format=csv|ndjson, gzipped
+    with ?gzip=1; filtered by ?status=, ?since= / ?until= (YYYY-MM-DD) and ?county=.
+    """
+    fmt = request.args.get('format', 'csv')
+    compress = request.args.get('gzip', type=int) == 1
+    try:
+        since, until = (datetime.strptime(request.args[name], '%Y-%m-%d').date() if request.args.get(name) else None
+                        for name in ('since', 'until'))
+        chunks = stream_export(kind, fmt, compress, status=request.args.get('status') or None,
+                               since=since, until=until, county=request.args.get('county') or None)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    log_activity('EXPORT_DATA', description=f'Exported {kind} as {fmt}: {request.query_string.decode()}')
+
+    mimetype = 'application/gzip' if compress else 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    response = current_app.response_class(stream_with_context(chunks), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={export_filename(kind, fmt, compress)}'
+    return response
+
+
 @admin_bp.route('/settings')
 @admin_required
 def settings():
@@ -398,16 +573,12 @@ def update_setting():
 @admin_bp.route('/statistics')
 @admin_required
 def statistics():
-    thirty_days_ago = datetime.now() - timedelta(days=30)
-
-    daily_stats = db.session.query(
-        func.date(MissingPerson.created_at).label('date'),
-        func.count(MissingPerson.id).label('count')
-    ).filter(
-        MissingPerson.created_at >= thirty_days_ago
-    ).group_by(
-        func.date(MissingPerson.created_at)
-    ).all()
+    today = date.today()
+    daily_stats = [
+        {'date': day, 'count': count}
+        for day, count in series(['cases_created'], today - timedelta(days=29), today)['cases_created']
+        if count
+    ]
 
     status_stats = db.session.query(
         MissingPerson.status,
@@ -425,3 +596,51 @@ def statistics():
                          daily_stats=daily_stats,
                          status_stats=status_stats,
                          report_stats=report_stats)
+
+
+@admin_bp.route('/statistics/series')
+@admin_required
+def statistics_series():
+    """
+    Daily rollup time series, e.g.
+    ?metrics=cases_created,cases_found&start=2025-01-01&end=2025-12-31&granularity=month
+    """
+    metrics = [m for m in request.args.get('metrics', ','.join(ROLLUP_METRICS)).split(',') if m]
+    granularity = request.args.get('granularity', 'day')
+    unknown = [m for m in metrics if m not in ROLLUP_METRICS]
+    if unknown:
+        return jsonify({'success': False, 'message': f'Unknown metrics: {", ".join(unknown)}'}), 400
+    if granularity not in GRANULARITIES:
+        return jsonify({'success': False, 'message': 'granularity must be day, week or month'}), 400
+
+    try:
+        end = date.fromisoformat(request.args['end']) if 'end' in request.args else date.today()
+        start = date.fromisoformat(request.args['start']) if 'start' in request.args else end - timedelta(days=29)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'start and end must be YYYY-MM-DD'}), 400
+    if start > end:
+        return jsonify({'success': False, 'message': 'start must not be after end'}), 400
+    if bucket_count(start, end, granularity) > MAX_BUCKETS:
+        return jsonify({'success': False,
+                        'message': f'At most {MAX_BUCKETS} {granularity}s per series; narrow the range'}), 400
+
+    return jsonify({
+        'success': True,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'granularity': granularity,
+        'series': {
+            metric: [{'period': bucket.isoformat(), 'count': count} for bucket, count in points]
+            for metric, points in series(metrics, start, end, granularity).items()
+        }
+    })
+
+
+@admin_bp.route('/cache-stats')
+@admin_required
+def cache_stats():
+    """Entries, hits, misses and hit rate of every in-process result cache"""
+    return jsonify({
+        cache.name: cache.stats()
+        for cache in current_app.extensions.values() if isinstance(cache, ResultCache)
+    })
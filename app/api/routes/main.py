@@ -3,11 +3,19 @@ from flask_login import login_required, current_user
 from datetime import datetime
 from app.api import bp
 from app.models.missing_person import MissingPerson
+from app.models.read_models import CaseSearchResult, RecentCase, MapPoint, AttributeMatch
+from app.utils.search import apply_search, phonetic_case_ids, possible_duplicates
+from app.utils.fuzzy import fuzzy_case_ids
+from app.utils.typeahead import get_typeahead, MAX_SUGGESTIONS
+from app.utils.facets import search_facets
+from app.utils.search_cache import search_key, cached_ids, MAX_SEARCH_RESULTS
+from app.utils.keyset import KeysetPage, keyset_keys
 from app.models.sighting import SightingReport
 from app.extensions import db
 from app.models.options import MissingPersonStatus, ReportStatus
 from sqlalchemy import and_, desc
-from datetime import datetime
+from datetime import datetime, timedelta
+from math import cos, radians
 
 @bp.route('/missing-persons', methods=['POST'])
 @login_required
@@ -41,7 +49,10 @@ def create_missing_person():
         return jsonify({
             'success': True,
             'message': 'Missing person report created successfully',
-            'person_id': person.id
+            'person_id': person.id,
+            'possible_duplicates': [
+                _duplicate_dict(duplicate) for duplicate in possible_duplicates(person.full_name, current_user, exclude_id=person.id)
+            ]
         }), 201
 
     except Exception as e:
@@ -49,6 +60,24 @@ def create_missing_person():
         return jsonify({'success': False, 'error': str(e)}), 400
 
 
+def _duplicate_dict(person):
+    return {
+        'id': person.id,
+        'full_name': person.full_name,
+        'case_number': person.case_number,
+        'last_seen_location': person.last_seen_location,
+        'last_seen_date': person.last_seen_date.isoformat() if person.last_seen_date else None
+    }
+
+
+@bp.route('/missing-persons/possible-duplicates')
+@login_required
+def api_possible_duplicates():
+    """Open cases whose name sounds like ?name=, to check before reporting"""
+    name = request.args.get('name', '')
+    return jsonify([_duplicate_dict(person) for person in possible_duplicates(name, current_user)])
+
+
 @bp.route('/sightings', methods=['POST'])
 def create_sighting():
     data = request.get_json()
@@ -82,57 +111,167 @@ def create_sighting():
 @bp.route('/search', methods=['GET'])
 def search_api():
     query = request.args.get('q', '')
-    limit = request.args.get('limit', 10, type=int)
+    limit = max(1, min(request.args.get('limit', 10, type=int), MAX_SEARCH_RESULTS))
+    fuzzy = request.args.get('fuzzy', type=int) == 1
+    phonetic = request.args.get('phonetic', type=int) == 1
+
+    base = MissingPerson.query.filter(MissingPerson.is_public == True)
+
+    def compute():
+        if fuzzy:
+            return fuzzy_case_ids(query, MAX_SEARCH_RESULTS)
+        if phonetic:
+            return phonetic_case_ids(query, MAX_SEARCH_RESULTS)
+        return [row[0] for row in
+                apply_search(base, query).with_entities(MissingPerson.id).limit(MAX_SEARCH_RESULTS)]
+
+    ids = cached_ids(search_key('api', query, fuzzy, phonetic), compute)[:limit]
+    rank = {case_id: position for position, case_id in enumerate(ids)}
+    results = sorted(CaseSearchResult.fetch(base.filter(MissingPerson.id.in_(ids))),
+                     key=lambda person: rank[person.id])
+
+    if request.args.get('facets', type=int) == 1:
+        return jsonify({
+            'results': [person.to_dict() for person in results],
+            'facets': search_facets(query)
+        })
+    return jsonify([person.to_dict() for person in results])
+
+def _range_filters(query, column, low, high):
+    if low is not None:
+        query = query.filter(column >= low)
+    if high is not None:
+        query = query.filter(column <= high)
+    return query
+
+
+@bp.route('/search/attributes')
+def api_attribute_search():
+    """
+    Public cases by physical attributes and place last seen, e.g.
+    ?gender=female&height_min=150&height_max=165&age_min=10&age_max=14&lat=-1.29&lng=36.82&radius_km=50
+
+    Every filter is a range over an indexed column; a radius becomes a
+    latitude/longitude bounding box in SQL and only the cases inside it are
+    checked for exact distance.
+    """
+    from app.api.routes.map import calculate_distance
+
+    args = request.args
+    limit = max(1, min(args.get('limit', 50, type=int), 200))
+    query = MissingPerson.query.filter(MissingPerson.is_public == True)
+
+    status = args.get('status', MissingPersonStatus.MISSING.value)
+    if status != 'all':
+        try:
+            query = query.filter(MissingPerson.status == MissingPersonStatus(status))
+        except ValueError:
+            return jsonify({'error': f'Unknown status: {status}'}), 400
+
+    gender = args.get('gender', '').strip()
+    if gender:
+        query = query.filter(MissingPerson.gender == gender.capitalize())
 
-    results = MissingPerson.query.filter(
-        MissingPerson.is_public == True,
-        (MissingPerson.full_name.ilike(f'%{query}%') |
-         MissingPerson.last_seen_location.ilike(f'%{query}%'))
-    ).limit(limit).all()
+    query = _range_filters(query, MissingPerson.age, args.get('age_min', type=int), args.get('age_max', type=int))
+    query = _range_filters(query, MissingPerson.height_cm,
+                           args.get('height_min', type=float), args.get('height_max', type=float))
+    query = _range_filters(query, MissingPerson.weight_kg,
+                           args.get('weight_min', type=float), args.get('weight_max', type=float))
+
+    days = args.get('days', type=int)
+    if days:
+        query = query.filter(MissingPerson.last_seen_date >= datetime.now() - timedelta(days=days))
+
+    lat, lng = args.get('lat', type=float), args.get('lng', type=float)
+    radius = args.get('radius_km', type=float)
+    if radius and (lat is None or lng is None):
+        return jsonify({'error': 'radius_km needs lat and lng'}), 400
+
+    if not radius:
+        cases = AttributeMatch.fetch(query.order_by(desc(MissingPerson.last_seen_date)).limit(limit))
+        return jsonify([case.to_dict() for case in cases])
+
+    lat_delta = radius / 111.32
+    lng_delta = radius / (111.32 * max(cos(radians(lat)), 0.01))
+    query = query.filter(
+        MissingPerson.latitude.between(lat - lat_delta, lat + lat_delta),
+        MissingPerson.longitude.between(lng - lng_delta, lng + lng_delta)
+    )
+
+    matches = []
+    for case in AttributeMatch.fetch(query):
+        distance = calculate_distance(lat, lng, case.latitude, case.longitude)
+        if distance <= radius:
+            matches.append((distance, case))
+    matches.sort(key=lambda match: match[0])
+
+    return jsonify([case.to_dict(distance) for distance, case in matches[:limit]])
+
+
+@bp.route('/search/suggest')
+def api_search_suggest():
+    """Typeahead suggestions for the search boxes, from the in-memory prefix index"""
+    query = request.args.get('q', '')
+    limit = max(1, min(request.args.get('limit', 8, type=int), MAX_SUGGESTIONS))
 
     return jsonify([{
-        'id': person.id,
-        'full_name': person.full_name,
-        'age': person.age,
-        'last_seen_location': person.last_seen_location,
-        'status': person.status.value
-    } for person in results])
+        'id': case_id,
+        'full_name': full_name,
+        'last_seen_location': location,
+        'case_number': case_number,
+        'url': url_for('main.person_detail', person_id=case_id)
+    } for case_id, full_name, location, case_number in get_typeahead().suggest(query, limit)])
+
 
 @bp.route('/recent-cases')
 def api_recent_cases():
     limit = request.args.get('limit', 6, type=int)
-    cases = MissingPerson.query.filter_by(
+    cases = RecentCase.fetch(MissingPerson.query.filter_by(
         is_public=True,
         status=MissingPersonStatus.MISSING
-    ).order_by(desc(MissingPerson.created_at)).limit(limit).all()
+    ).order_by(desc(MissingPerson.created_at)).limit(limit))
+
+    return jsonify([case.to_dict() for case in cases])
 
-    return jsonify([{
-        'id': case.id,
-        'full_name': case.full_name,
-        'age': case.age,
-        'last_seen_location': case.last_seen_location,
-        'last_seen_date': case.last_seen_date.isoformat() if case.last_seen_date else None,
-        'photo_url': url_for('static', filename=f'uploads/{case.photos.first().filename}')
-        if case.photos.first() else None
-    } for case in cases])
+
+@bp.route('/cases')
+def api_cases():
+    """
+    Public cases, newest first, a page at a time. Pass the returned
+    next_cursor as ?after= (or prev_cursor as ?before=) for the next page.
+    """
+    per_page = max(1, min(request.args.get('per_page', 20, type=int), 100))
+    query = MissingPerson.query.filter(MissingPerson.is_public == True)
+
+    status = request.args.get('status', '')
+    if status:
+        try:
+            query = query.filter(MissingPerson.status == MissingPersonStatus(status))
+        except ValueError:
+            return jsonify({'error': f'Unknown status: {status}'}), 400
+
+    keys, has_next, has_prev = keyset_keys(
+        query, MissingPerson.created_at, MissingPerson.id,
+        after=request.args.get('after'), before=request.args.get('before'), per_page=per_page
+    )
+    rank = {ident: position for position, (_, ident) in enumerate(keys)}
+    cases = sorted(RecentCase.fetch(query.filter(MissingPerson.id.in_(rank))),
+                   key=lambda case: rank[case.id])
+    total = query.count() if request.args.get('count', type=int) == 1 else None
+    page = KeysetPage(cases, keys, per_page, has_next, has_prev, total)
+
+    return jsonify({'results': [case.to_dict() for case in page], **page.cursors()})
 
 
 @bp.route('/map-data')
 def api_map_data():
-    cases = MissingPerson.query.filter(
+    cases = MapPoint.fetch(MissingPerson.query.filter(
         and_(
             MissingPerson.is_public == True,
             MissingPerson.status == MissingPersonStatus.MISSING,
             MissingPerson.latitude.isnot(None),
             MissingPerson.longitude.isnot(None)
         )
-    ).all()
+    ))
 
-    return jsonify([{
-        'id': case.id,
-        'name': case.full_name,
-        'lat': case.latitude,
-        'lng': case.longitude,
-        'location': case.last_seen_location,
-        'date': case.last_seen_date.isoformat() if case.last_seen_date else None
-    } for case in cases])
\ No newline at end of file
+    return jsonify([case.to_dict() for case in cases])
\ No newline at end of file
@@ -3,10 +3,14 @@ from flask_login import login_required, current_user
 from app.models.missing_person import MissingPerson, PersonPhoto
 from app.models.sighting import SightingReport, SightingPhoto
 from app.models.options import MissingPersonStatus, ReportStatus
+from app.models.loaders import view_options
+from app.models.read_models import MapMarker
+from app.utils.stats import site_stats
+from app.utils.search import apply_search
 # from app.models.system import ActivityLog, Notification
 from app.extensions import db
 from datetime import datetime, timedelta
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, and_
 import requests
 from functools import lru_cache
 
@@ -167,67 +171,25 @@ def get_map_markers():
         
         # Apply search query
         if search_query:
-            query = query.filter(
-                or_(
-                    MissingPerson.full_name.ilike(f'%{search_query}%'),
-                    MissingPerson.last_seen_location.ilike(f'%{search_query}%'),
-                    MissingPerson.case_number.ilike(f'%{search_query}%')
-                )
-            )
+            query = apply_search(query, search_query, ranked=False)
         
-        # Execute query
-        missing_persons = query.filter(
+        # Execute query, selecting only the columns a marker needs
+        missing_persons = MapMarker.fetch(query.filter(
             and_(
                 MissingPerson.latitude.isnot(None),
                 MissingPerson.longitude.isnot(None)
             )
-        ).all()
+        ))
         
         # Build markers array
-        markers = []
-        
-        for person in missing_persons:
-            # Get primary photo
-            primary_photo = person.photos.filter_by(is_primary=True).first()
-            if not primary_photo:
-                primary_photo = person.photos.first()
-            
-            # Get sighting count
-            sighting_count = person.sighting_reports.filter_by(
-                status=ReportStatus.VERIFIED
-            ).count()
-            
-            # Calculate days missing
-            days_missing = (datetime.now() - person.last_seen_date).days
-            
-            marker_data = {
-                'id': person.id,
-                'type': 'missing_person',
-                'lat': person.latitude,
-                'lng': person.longitude,
-                'name': person.full_name,
-                'age': person.age,
-                'gender': person.gender,
-                'status': person.status.value,
-                'case_number': person.case_number,
-                'last_seen_location': person.last_seen_location,
-                'last_seen_date': person.last_seen_date.isoformat(),
-                'days_missing': days_missing,
-                'is_minor': person.is_minor,
-                'is_verified': person.is_verified,
-                'photo_url': person.display_image_url,
-                'sighting_count': sighting_count,
-                'view_count': person.view_count,
-                'description': person.circumstances[:200] if person.circumstances else None
-            }
-            
-            markers.append(marker_data)
+        now = datetime.now()
+        markers = [person.to_dict(now) for person in missing_persons]
         
         # Get verified sightings if requested
         include_sightings = request.args.get('include_sightings', 'true').lower() == 'true'
         
         if include_sightings:
-            sightings_query = SightingReport.query.filter_by(
+            sightings_query = SightingReport.query.options(*view_options('map_sightings')).filter_by(
                 status=ReportStatus.VERIFIED
             ).filter(
                 and_(
@@ -307,7 +269,7 @@ def get_person_details(person_id):
         
         # Get all photos
         photos = [{
-            'url': photo.file_path,
+            'url': photo.url,
             'is_primary': photo.is_primary,
             'caption': photo.caption
         } for photo in person.photos.all()]
@@ -357,7 +319,7 @@ def get_person_details(person_id):
                 'contact_email': person.contact_email,
                 'photos': photos,
                 'sightings': sightings,
-                'view_count': person.view_count
+                'view_count': person.total_views
             }
         }), 200
         
@@ -458,15 +420,10 @@ def get_map_statistics():
     """Get overall statistics for the map"""
     try:
         # Overall stats
-        total_missing = MissingPerson.query.filter_by(is_public=True).count()
-        total_found = MissingPerson.query.filter_by(
-            is_public=True,
-            status=MissingPersonStatus.FOUND
-        ).count()
-        total_investigating = MissingPerson.query.filter_by(
-            is_public=True,
-            status=MissingPersonStatus.INVESTIGATING
-        ).count()
+        counts = site_stats()
+        total_missing = counts['public_cases']
+        total_found = counts['public_cases.found']
+        total_investigating = counts['public_cases.investigating']
         
         # Recent cases (last 30 days)
         thirty_days_ago = datetime.now() - timedelta(days=30)
@@ -478,11 +435,7 @@ def get_map_statistics():
         ).count()
         
         # Minors count
-        minors = MissingPerson.query.filter_by(
-            is_public=True,
-            is_minor=True,
-            status=MissingPersonStatus.MISSING
-        ).count()
+        minors = counts['public_minors.missing']
         
         # Hotspot regions (top 5 locations)
         hotspots = db.session.query(
@@ -5,9 +5,11 @@ from app.models.missing_person import MissingPerson, PersonPhoto
 from app.models.sighting import SightingReport, SightingPhoto
 from flask_login import login_required, current_user
 import os
+import tempfile
 import uuid
 from PIL import Image
 from datetime import datetime
+from app.utils.storage import get_storage, shard_key
 
 from app.api import bp as photo_bp
 
@@ -56,37 +58,41 @@ def optimize_image(file_path, max_dimension=IMAGE_MAX_DIMENSION):
         return False
 
 
-def save_uploaded_file(file, upload_folder):
-    """Save uploaded file with unique name"""
+def save_uploaded_file(file, category=None):
+    """Save uploaded file with unique name to the configured upload storage"""
+    tmp_path = None
     try:
         # Generate unique filename
         original_filename = secure_filename(file.filename)
         file_ext = original_filename.rsplit('.', 1)[1].lower()
         unique_filename = f"{uuid.uuid4().hex}_{datetime.now().strftime('%Y%m%d%H%M%S')}.{file_ext}"
+        key = shard_key(unique_filename, category)
         
-        # Ensure upload directory exists
-        os.makedirs(upload_folder, exist_ok=True)
+        # Optimize on a local temp copy so every backend stores the final bytes
+        fd, tmp_path = tempfile.mkstemp(suffix=f'.{file_ext}')
+        os.close(fd)
+        file.save(tmp_path)
+        optimize_image(tmp_path)
         
-        # Save file
-        file_path = os.path.join(upload_folder, unique_filename)
-        file.save(file_path)
-        
-        # Get file size
-        file_size = os.path.getsize(file_path)
-        
-        # Optimize image
-        optimize_image(file_path)
+        # Hand the file over to storage
+        storage = get_storage()
+        file_size = storage.import_file(tmp_path, key, content_type=file.content_type)
+        tmp_path = None
         
         return {
             'success': True,
             'filename': unique_filename,
-            'file_path': file_path,
+            'file_path': key,
+            'url': storage.url(key),
             'file_size': file_size,
             'mime_type': file.content_type
         }
     except Exception as e:
         current_app.logger.error(f"File save error: {str(e)}")
         return {'success': False, 'error': str(e)}
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
 
 
 @photo_bp.route('/photos/missing-person/<int:person_id>', methods=['POST'])
@@ -137,10 +143,10 @@ def upload_missing_person_photos(person_id):
         primary_index = request.form.get('is_primary', type=int, default=0)
         captions = request.form.getlist('captions[]')
         
-        # Upload folder setup
-        upload_folder = os.path.join(current_app.static_folder, 'uploads')
+        storage = get_storage()
         
         uploaded_photos = []
+        saved_keys = []
         errors = []
         
         # Process each file
@@ -160,7 +166,7 @@ def upload_missing_person_photos(person_id):
                 continue
             
             # Save file
-            result = save_uploaded_file(file, upload_folder)
+            result = save_uploaded_file(file)
             
             if not result['success']:
                 errors.append(f"File {idx + 1}: {result.get('error', 'Upload failed')}")
@@ -179,9 +185,10 @@ def upload_missing_person_photos(person_id):
                 )
                 
                 db.session.add(photo)
+                saved_keys.append(result['file_path'])
                 uploaded_photos.append({
                     'filename': result['filename'],
-                    'url': f"/static/uploads/{result['filename']}",
+                    'url': result['url'],
                     'is_primary': idx == primary_index,
                     'caption': photo.caption
                 })
@@ -189,7 +196,7 @@ def upload_missing_person_photos(person_id):
                 errors.append(f"File {idx + 1}: Database error - {str(e)}")
                 # Clean up uploaded file
                 try:
-                    os.remove(result['file_path'])
+                    storage.delete(result['file_path'])
                 except:
                     pass
                 continue
@@ -212,10 +219,9 @@ def upload_missing_person_photos(person_id):
             except Exception as e:
                 db.session.rollback()
                 # Clean up uploaded files
-                for photo_data in uploaded_photos:
+                for key in saved_keys:
                     try:
-                        file_path = os.path.join(upload_folder, photo_data['filename'])
-                        os.remove(file_path)
+                        storage.delete(key)
                     except:
                         pass
                 
@@ -280,10 +286,10 @@ def upload_sighting_photos(sighting_id):
                 'error': f'Maximum {MAX_FILES_PER_UPLOAD} files allowed per upload'
             }), 400
         
-        # Upload folder setup
-        upload_folder = os.path.join(current_app.static_folder, 'uploads', 'sightings')
+        storage = get_storage()
         
         uploaded_photos = []
+        saved_keys = []
         errors = []
         
         # Process each file
@@ -303,7 +309,7 @@ def upload_sighting_photos(sighting_id):
                 continue
             
             # Save file
-            result = save_uploaded_file(file, upload_folder)
+            result = save_uploaded_file(file, 'sightings')
             
             if not result['success']:
                 errors.append(f"File {idx + 1}: {result.get('error', 'Upload failed')}")
@@ -320,15 +326,16 @@ def upload_sighting_photos(sighting_id):
                 )
                 
                 db.session.add(photo)
+                saved_keys.append(result['file_path'])
                 uploaded_photos.append({
                     'filename': result['filename'],
-                    'url': f"/static/uploads/sightings/{result['filename']}",
+                    'url': result['url'],
                 })
             except Exception as e:
                 errors.append(f"File {idx + 1}: Database error - {str(e)}")
                 # Clean up uploaded file
                 try:
-                    os.remove(result['file_path'])
+                    storage.delete(result['file_path'])
                 except:
                     pass
                 continue
@@ -351,10 +358,9 @@ def upload_sighting_photos(sighting_id):
             except Exception as e:
                 db.session.rollback()
                 # Clean up uploaded files
-                for photo_data in uploaded_photos:
+                for key in saved_keys:
                     try:
-                        file_path = os.path.join(upload_folder, photo_data['filename'])
-                        os.remove(file_path)
+                        storage.delete(key)
                     except:
                         pass
                 
@@ -389,12 +395,11 @@ def delete_missing_person_photo(person_id, photo_id):
         if missing_person.reported_by != current_user.id and not current_user.is_admin:
             return jsonify({'success': False, 'error': 'Unauthorized'}), 403
         
-        # Delete file from filesystem
+        # Delete file from storage
         try:
-            if os.path.exists(photo.file_path):
-                os.remove(photo.file_path)
+            get_storage().delete(photo.storage_key)
         except Exception as e:
-            current_app.logger.warning(f"Could not delete file {photo.file_path}: {str(e)}")
+            current_app.logger.warning(f"Could not delete file {photo.storage_key}: {str(e)}")
         
         # Delete from database
         db.session.delete(photo)
@@ -425,12 +430,11 @@ def delete_sighting_photo(sighting_id, photo_id):
         if sighting.reported_by != current_user.id and not current_user.is_admin:
             return jsonify({'success': False, 'error': 'Unauthorized'}), 403
         
-        # Delete file from filesystem
+        # Delete file from storage
         try:
-            if os.path.exists(photo.file_path):
-                os.remove(photo.file_path)
+            get_storage().delete(photo.storage_key)
         except Exception as e:
-            current_app.logger.warning(f"Could not delete file {photo.file_path}: {str(e)}")
+            current_app.logger.warning(f"Could not delete file {photo.storage_key}: {str(e)}")
         
         # Delete from database
         db.session.delete(photo)
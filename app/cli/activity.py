@@ -0,0 +1,58 @@
+import click
+import json
+from datetime import datetime, time
+from flask import current_app
+from flask.cli import with_appcontext
+from app.utils.log_archive import archive_activity_logs, search_archives
+
+
+@click.command('archive-activity-logs')
+@click.option('--older-than', type=int, default=None,
+              help='Archive logs older than this many days (default: ACTIVITY_LOG_RETENTION_DAYS)')
+@click.option('--batch-size', default=5000, help='Rows moved per transaction')
+@with_appcontext
+def archive_activity_logs_command(older_than, batch_size):
+    """Move old activity logs into monthly NDJSON.gz archives."""
+    days = older_than if older_than is not None else current_app.config.get('ACTIVITY_LOG_RETENTION_DAYS', 90)
+    archived = archive_activity_logs(days, batch_size)
+
+    for (year, month), count in sorted(archived.items()):
+        click.echo(f"  {year:04d}-{month:02d}: {count} entries")
+    click.echo(f"✅ Archived {sum(archived.values())} activity logs older than {days} days")
+
+
+def _end_of_day(ctx, param, value):
+    """--until as a datetime; a date alone means the end of that day"""
+    if value is None:
+        return None
+    try:
+        return datetime.combine(datetime.strptime(value, '%Y-%m-%d').date(), time.max)
+    except ValueError:
+        return click.DateTime().convert(value, param, ctx)
+
+
+@click.command('search-activity-archive')
+@click.option('--since', type=click.DateTime(), default=None, help='Earliest entry time')
+@click.option('--until', default=None, callback=_end_of_day,
+              help='Latest entry time (a date alone includes the whole day)')
+@click.option('--action', default=None, help='Substring of the action, case-insensitive')
+@click.option('--user-id', type=int, default=None)
+@click.option('--entity-type', default=None)
+@click.option('--entity-id', type=int, default=None)
+@click.option('--contains', default=None, help='Substring of the description, case-insensitive')
+@click.option('--limit', type=int, default=None, help='Stop after this many matches')
+@with_appcontext
+def search_activity_archive_command(since, until, action, user_id, entity_type, entity_id, contains, limit):
+    """Stream archived activity logs matching the filters as NDJSON."""
+    matches = search_archives(since, until, action=action, user_id=user_id, entity_type=entity_type,
+                              entity_id=entity_id, contains=contains)
+    for count, entry in enumerate(matches, 1):
+        click.echo(json.dumps(entry))
+        if limit and count >= limit:
+            break
+
+
+def init_app(app):
+    """Register CLI commands with the Flask app."""
+    app.cli.add_command(archive_activity_logs_command)
+    app.cli.add_command(search_activity_archive_command)
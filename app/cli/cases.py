@@ -0,0 +1,215 @@
+import click
+from datetime import date, timedelta
+from flask.cli import with_appcontext
+from sqlalchemy import select
+from app.extensions import db
+from app.models.missing_person import MissingPerson
+from app.models.sighting import SightingReport
+from app.models.events import case_counter_values, empty_case_counters, update_person_columns, refresh_name_keys, refresh_cities, refresh_measurements
+from app.utils.search import get_search
+from app.utils.stats import reconcile_stats
+from app.utils.rollups import history_start, rebuild_rollups, stamp_missing_status_dates
+from app.utils.report_priority import score_reports, rescore_pending_reports
+from app.utils.user_search import backfill_user_search
+
+
+def reconcile_case_counters():
+    """
+    Recompute the denormalized counters of every case.
+
+    One grouped query per table computes all counters; cases without photos
+    or verified sightings are reset to zero. Returns the number of cases.
+    """
+    connection = db.session.connection()
+    counters = case_counter_values(connection)
+    person_ids = db.session.execute(select(MissingPerson.id)).scalars().all()
+
+    update_person_columns(connection, {
+        pid: counters.get(pid) or empty_case_counters() for pid in person_ids
+    }, db.session)
+    db.session.commit()
+    return len(person_ids)
+
+
+@click.command('reconcile-case-counters')
+@with_appcontext
+def reconcile_case_counters_command():
+    """Recompute sighting/photo counters of every missing person."""
+    total = reconcile_case_counters()
+    click.echo(f"✅ Reconciled counters for {total} missing persons")
+
+
+@click.command('reconcile-stats')
+@with_appcontext
+def reconcile_stats_command():
+    """Recount the site-wide statistics counters."""
+    drifted = reconcile_stats()
+    for metric, (old, new) in sorted(drifted.items()):
+        click.echo(f"  {metric}: {old} -> {new}")
+    click.echo(f"✅ Reconciled site statistics ({len(drifted)} counters corrected)")
+
+
+@click.command('backfill-rollups')
+@click.option('--chunk-days', default=30, help='Days recounted per transaction')
+@click.option('--since', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='First day to rebuild (default: the start of history)')
+@with_appcontext
+def backfill_rollups_command(chunk_days, since):
+    """Recount the daily statistics rollups from the source tables."""
+    stamped = stamp_missing_status_dates(db.session.connection())
+    db.session.commit()
+
+    start = since.date() if since else history_start(db.session.connection())
+    if start is None:
+        click.echo("✅ Nothing to roll up")
+        return
+
+    end = date.today() + timedelta(days=1)
+    rows = 0
+    while start < end:
+        chunk_end = min(start + timedelta(days=chunk_days), end)
+        rows += rebuild_rollups(db.session.connection(), start, chunk_end)
+        db.session.commit()
+        start = chunk_end
+
+    click.echo(f"✅ Rebuilt daily rollups ({rows} metric-days, {stamped} found/closed cases dated)")
+
+
+@click.command('backfill-name-keys')
+@click.option('--batch-size', default=1000, help='Cases rewritten per transaction')
+@with_appcontext
+def backfill_name_keys_command(batch_size):
+    """Compute phonetic name keys of every missing person."""
+    done = 0
+    last_id = 0
+
+    while True:
+        rows = db.session.execute(
+            select(MissingPerson.id, MissingPerson.full_name)
+            .where(MissingPerson.id > last_id)
+            .order_by(MissingPerson.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        refresh_name_keys(db.session, dict(rows))
+        db.session.commit()
+        done += len(rows)
+
+    click.echo(f"✅ Computed phonetic name keys for {done} missing persons")
+
+
+@click.command('backfill-cities')
+@click.option('--batch-size', default=1000, help='Cases rewritten per transaction')
+@with_appcontext
+def backfill_cities_command(batch_size):
+    """Derive last_seen_city from last_seen_location for every missing person."""
+    done = 0
+    last_id = 0
+
+    while True:
+        rows = db.session.execute(
+            select(MissingPerson.id, MissingPerson.last_seen_location)
+            .where(MissingPerson.id > last_id)
+            .order_by(MissingPerson.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        refresh_cities(db.session, dict(rows))
+        db.session.commit()
+        done += len(rows)
+
+    click.echo(f"✅ Derived cities for {done} missing persons")
+
+
+@click.command('backfill-measurements')
+@click.option('--batch-size', default=1000, help='Cases rewritten per transaction')
+@with_appcontext
+def backfill_measurements_command(batch_size):
+    """Parse height/weight text into height_cm/weight_kg for every missing person."""
+    done = 0
+    parsed = 0
+    last_id = 0
+
+    while True:
+        rows = db.session.execute(
+            select(MissingPerson.id, MissingPerson.height, MissingPerson.weight)
+            .where(MissingPerson.id > last_id)
+            .order_by(MissingPerson.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        refresh_measurements(db.session, {row.id: (row.height, row.weight) for row in rows})
+        db.session.commit()
+        done += len(rows)
+        parsed += sum(1 for row in rows if row.height or row.weight)
+
+    click.echo(f"✅ Parsed measurements for {done} missing persons ({parsed} with height or weight text)")
+
+
+@click.command('rescore-reports')
+@click.option('--all', 'every_report', is_flag=True,
+              help='Score reviewed reports too (for reports created before scoring existed)')
+@click.option('--batch-size', default=1000, help='Reports scored per transaction')
+@with_appcontext
+def rescore_reports_command(every_report, batch_size):
+    """Recompute moderation priority scores of sighting reports."""
+    if not every_report:
+        click.echo(f"✅ Rescored {rescore_pending_reports()} pending reports")
+        return
+
+    done = 0
+    last_id = 0
+    while True:
+        report_ids = db.session.execute(
+            select(SightingReport.id).where(SightingReport.id > last_id)
+            .order_by(SightingReport.id).limit(batch_size)
+        ).scalars().all()
+        if not report_ids:
+            break
+        last_id = report_ids[-1]
+
+        done += score_reports(db.session.connection(), report_ids, session=db.session)
+        db.session.commit()
+
+    click.echo(f"✅ Rescored {done} sighting reports")
+
+
+@click.command('backfill-user-search')
+@click.option('--batch-size', default=1000, help='Users indexed per transaction')
+@with_appcontext
+def backfill_user_search_command(batch_size):
+    """Index usernames, emails and name tokens of every user for the admin search."""
+    total = backfill_user_search(batch_size)
+    click.echo(f"✅ Indexed {total} users for search")
+
+
+@click.command('rebuild-search-index')
+@with_appcontext
+def rebuild_search_index_command():
+    """Rebuild the full-text case search index from scratch."""
+    search = get_search()
+    with db.engine.begin() as connection:
+        search.rebuild(connection)
+    click.echo(f"✅ Rebuilt search index ({search.name})")
+
+
+def init_app(app):
+    """Register CLI commands with the Flask app."""
+    app.cli.add_command(reconcile_case_counters_command)
+    app.cli.add_command(reconcile_stats_command)
+    app.cli.add_command(backfill_rollups_command)
+    app.cli.add_command(rebuild_search_index_command)
+    app.cli.add_command(backfill_name_keys_command)
+    app.cli.add_command(backfill_cities_command)
+    app.cli.add_command(backfill_measurements_command)
+    app.cli.add_command(rescore_reports_command)
+    app.cli.add_command(backfill_user_search_command)
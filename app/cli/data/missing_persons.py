@@ -2,6 +2,7 @@ import click
 from app.extensions import db
 from app.models.missing_person import MissingPerson, PersonPhoto
 from app.models.options import MissingPersonStatus
+from app.models.events import refresh_primary_photos, refresh_case_counters
 from datetime import datetime, timedelta
 import random
 from app.cli.data.utils import generate_random_date, generate_coordinates
@@ -102,6 +103,10 @@ def create_missing_persons(users, count=50):
             photos.append(photo)
     
     db.session.bulk_save_objects(photos)
+    # Bulk saves skip flush events, so resolve derived columns explicitly
+    person_ids = [person.id for person in all_persons]
+    refresh_primary_photos(db.session, person_ids)
+    refresh_case_counters(db.session, person_ids)
     db.session.commit()
     
     click.echo(f"✅ Created {len(missing_persons)} missing persons with {len(photos)} photos")
@@ -2,6 +2,10 @@ import click
 from app.extensions import db
 from app.models.sighting import SightingReport, SightingPhoto
 from app.models.options import UserRole, ReportStatus
+from app.models.events import refresh_case_counters
+from app.utils.stats import reconcile_stats
+from app.utils.rollups import rebuild_rollups_spanning
+from app.utils.report_priority import score_reports
 from datetime import timedelta
 import random
 from app.cli.data.utils import generate_random_date, generate_coordinates
@@ -80,6 +84,14 @@ def create_sighting_reports(users, missing_persons, count=100):
         sightings.append(sighting)
     
     db.session.bulk_save_objects(sightings)
+    # Bulk saves skip flush events, so recompute the case counters explicitly
+    refresh_case_counters(db.session, {sighting.missing_person_id for sighting in sightings})
+    db.session.commit()
+    # ... and the site-wide counters and rollups
+    reconcile_stats()
+    rebuild_rollups_spanning(db.session.connection(), [
+        value for sighting in sightings for value in (sighting.created_at, sighting.verified_at)
+    ])
     db.session.commit()
     
     # Reload to get IDs and add photos to some sightings
@@ -100,6 +112,8 @@ def create_sighting_reports(users, missing_persons, count=100):
             photos.append(photo)
     
     db.session.bulk_save_objects(photos)
+    # Score the new reports for the moderation queue, now their photos are in
+    score_reports(db.session.connection(), [sighting.id for sighting in all_sightings], session=db.session)
     db.session.commit()
     
     click.echo(f"✅ Created {len(sightings)} sighting reports with {len(photos)} photos")
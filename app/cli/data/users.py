@@ -4,6 +4,9 @@ from app.models.user import User
 from app.models.options import UserRole
 import random
 from app.cli.data.utils import generate_random_date
+from app.utils.stats import reconcile_stats
+from app.utils.rollups import rebuild_rollups_spanning
+from app.utils.user_search import backfill_user_search
 from app.cli.data.pools import FIRST_NAMES_FEMALE, FIRST_NAMES_MALE, LAST_NAMES, KENYAN_CITIES, NAIROBI_LOCATIONS
 
 def create_users(count=20):
@@ -44,5 +47,11 @@ def create_users(count=20):
     
     db.session.bulk_save_objects(users)
     db.session.commit()
+    # Bulk saves skip flush events, so index the users for the admin search
+    # and recount the site-wide counters and the rollups they fall in explicitly
+    backfill_user_search()
+    reconcile_stats()
+    rebuild_rollups_spanning(db.session.connection(), [user.created_at for user in users])
+    db.session.commit()
     click.echo(f"✅ Created {len(users)} users")
     return users
@@ -0,0 +1,38 @@
+import click
+from flask.cli import with_appcontext
+from app.utils.exports import SOURCES, FORMATS, stream_export, export_filename
+
+
+@click.command('export')
+@click.argument('kind', type=click.Choice(list(SOURCES)))
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), default='csv')
+@click.option('--gzip', 'compress', is_flag=True, help='Gzip the output')
+@click.option('--status', default=None, help='Case or report status')
+@click.option('--since', type=click.DateTime(formats=['%Y-%m-%d']), default=None, help='First creation day')
+@click.option('--until', type=click.DateTime(formats=['%Y-%m-%d']), default=None, help='Last creation day')
+@click.option('--county', default=None, help="Case's last-seen city/county")
+@click.option('--output', '-o', default=None,
+              help='File to write, "-" for stdout (default: <kind>-<date>.<format>[.gz])')
+@with_appcontext
+def export_command(kind, fmt, compress, status, since, until, county, output):
+    """Export cases, reports or activity logs as CSV or NDJSON."""
+    try:
+        chunks = stream_export(kind, fmt, compress, status=status, county=county,
+                               since=since.date() if since else None, until=until.date() if until else None)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+    output = output or export_filename(kind, fmt, compress)
+    written = 0
+    with click.open_file(output, 'wb') as out:
+        for chunk in chunks:
+            out.write(chunk)
+            written += len(chunk)
+
+    if output != '-':
+        click.echo(f"✅ Exported {kind} to {output} ({written} bytes)")
+
+
+def init_app(app):
+    """Register CLI commands with the Flask app."""
+    app.cli.add_command(export_command)
@@ -9,6 +9,8 @@ from app.models.audit import Notification, ActivityLog, Message, SystemSetting
 from app.models.options import UserRole, MissingPersonStatus, ReportStatus
 from flask import current_app
 from app.cli.data.pools import SYSTEM_SETTINGS
+from app.utils.stats import reconcile_stats
+from app.utils.rollups import rebuild_rollups_spanning, stored_rollup_range
 from app.cli.data import (
     create_users, create_missing_persons, create_sighting_reports, create_notifications, 
     create_messages, create_activity_logs, create_system_settings
@@ -124,6 +126,7 @@ def clear_sample_data(confirm):
     
     try:
         click.echo("\n🗑️  Clearing data...\n")
+        rollup_range = stored_rollup_range(db.session.connection())
         
         # Delete in reverse order of dependencies
         activity_count = ActivityLog.query.delete()
@@ -155,6 +158,11 @@ def clear_sample_data(confirm):
         setting_count = SystemSetting.query.delete()
         click.echo(f"✅ Deleted {setting_count} system settings")
         
+        db.session.commit()
+        # Bulk deletes skip flush events, so recount the site-wide counters
+        # and rollups
+        reconcile_stats()
+        rebuild_rollups_spanning(db.session.connection(), rollup_range)
         db.session.commit()
         
         click.echo("\n" + "="*60)
@@ -0,0 +1,145 @@
+import click
+import os
+from concurrent.futures import ThreadPoolExecutor
+from flask.cli import with_appcontext
+from flask import current_app
+from sqlalchemy import select, update
+from app.extensions import db
+from app.models.missing_person import MissingPerson, PersonPhoto
+from app.models.sighting import SightingPhoto
+from app.models.events import refresh_primary_photos
+from app.utils.storage import get_storage, shard_key, legacy_key, is_storage_key
+
+PHOTO_MODELS = [
+    (PersonPhoto, None),
+    (SightingPhoto, 'sightings'),
+]
+
+
+def _find_source(static_folder, filename, file_path, category):
+    """Locate the file of a pre-sharding photo on local disk"""
+    candidates = [os.path.join(static_folder, *legacy_key(filename, category).split('/'))]
+    if file_path and os.path.isabs(file_path):
+        candidates.append(file_path)
+
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def _migrate_file(storage, static_folder, row, category):
+    """Move one photo into its sharded key. Returns (id, new_key or None)"""
+    photo_id, filename, file_path = row
+    key = shard_key(filename, category)
+
+    source = _find_source(static_folder, filename, file_path, category)
+    if source:
+        storage.import_file(source, key)
+        return photo_id, key
+
+    # Already moved by an earlier, interrupted run
+    if storage.exists(key):
+        return photo_id, key
+    return photo_id, None
+
+
+@click.command('migrate-uploads')
+@click.option('--workers', default=8, help='Number of parallel file movers')
+@click.option('--batch-size', default=500, help='Rows moved and rewritten per batch')
+@click.option('--dry-run', is_flag=True, help='Only report what would be migrated')
+@with_appcontext
+def migrate_uploads(workers, batch_size, dry_run):
+    """Move uploaded photos into the sharded storage layout."""
+
+    click.echo("\n" + "="*60)
+    click.echo(click.style("📦 UPLOAD STORAGE MIGRATION", fg='cyan', bold=True))
+    click.echo("="*60)
+
+    storage = get_storage()
+    static_folder = current_app.static_folder
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for model, category in PHOTO_MODELS:
+            migrated = missing = 0
+            last_id = 0
+
+            while True:
+                rows = db.session.execute(
+                    select(model.id, model.filename, model.file_path)
+                    .where(model.id > last_id)
+                    .order_by(model.id)
+                    .limit(batch_size)
+                ).all()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+
+                pending = [row for row in rows if not is_storage_key(row[2])]
+                if dry_run:
+                    migrated += len(pending)
+                    continue
+
+                results = executor.map(
+                    lambda row: _migrate_file(storage, static_folder, row, category),
+                    pending
+                )
+                updates = []
+                for photo_id, key in results:
+                    if key:
+                        updates.append({'id': photo_id, 'file_path': key})
+                    else:
+                        missing += 1
+
+                # Rewrite file_path for the whole batch in one executemany
+                if updates:
+                    db.session.execute(update(model), updates)
+                    if model is PersonPhoto:
+                        person_ids = db.session.execute(
+                            select(PersonPhoto.person_id).where(
+                                PersonPhoto.id.in_([u['id'] for u in updates])
+                            )
+                        ).scalars()
+                        refresh_primary_photos(db.session, person_ids)
+                    db.session.commit()
+                migrated += len(updates)
+
+            label = 'Would migrate' if dry_run else 'Migrated'
+            click.echo(f"✅ {model.__tablename__}: {label} {migrated} files")
+            if missing:
+                click.echo(click.style(f"⚠️  {model.__tablename__}: {missing} files not found on disk", fg='yellow'))
+
+    click.echo("="*60 + "\n")
+
+
+@click.command('refresh-primary-photos')
+@click.option('--batch-size', default=1000, help='Persons refreshed per batch')
+@with_appcontext
+def refresh_primary_photos_command(batch_size):
+    """Recompute the cached primary photo of every missing person."""
+
+    refreshed = 0
+    last_id = 0
+
+    while True:
+        person_ids = db.session.execute(
+            select(MissingPerson.id)
+            .where(MissingPerson.id > last_id)
+            .order_by(MissingPerson.id)
+            .limit(batch_size)
+        ).scalars().all()
+        if not person_ids:
+            break
+        last_id = person_ids[-1]
+
+        refresh_primary_photos(db.session, person_ids)
+        db.session.commit()
+        refreshed += len(person_ids)
+
+    click.echo(f"✅ Refreshed primary photos for {refreshed} missing persons")
+
+
+def init_app(app):
+    """Register CLI commands with the Flask app."""
+    app.cli.add_command(migrate_uploads)
+    app.cli.add_command(refresh_primary_photos_command)
@@ -10,6 +10,8 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///app.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ECHO = False
+    # Raise on relationship loads a view's loader preset did not cover
+    SQLALCHEMY_STRICT_LOADING = False
     
     WTF_CSRF_ENABLED = True
     WTF_CSRF_TIME_LIMIT = None
@@ -31,10 +33,60 @@ class Config:
     MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
     MAX_FILES_PER_UPLOAD = 10
     IMAGE_MAX_DIMENSION = 2048
-    
+
+    # Upload storage: 'local' (sharded below static/uploads) or 's3'
+    UPLOAD_STORAGE_BACKEND = os.environ.get('UPLOAD_STORAGE_BACKEND', 'local')
+    S3_BUCKET = os.environ.get('S3_BUCKET')
+    S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL')
+    S3_REGION = os.environ.get('S3_REGION')
+    S3_ACCESS_KEY_ID = os.environ.get('S3_ACCESS_KEY_ID')
+    S3_SECRET_ACCESS_KEY = os.environ.get('S3_SECRET_ACCESS_KEY')
+    S3_PUBLIC_URL = os.environ.get('S3_PUBLIC_URL')
+    # How often a key missing from the in-memory upload index is re-checked
+    UPLOAD_INDEX_RECHECK_SECONDS = 300
+    # How often the upload index rescans storage (in the background)
+    UPLOAD_INDEX_REFRESH_SECONDS = 900
+
+    # Page views are buffered in memory and written in batches
+    VIEW_COUNT_FLUSH_INTERVAL = 30  # seconds
+    VIEW_COUNT_FLUSH_THRESHOLD = 500  # pending views that trigger an early flush
+
+    # Admin activity logs are queued in memory and inserted in batches
+    ACTIVITY_LOG_FLUSH_INTERVAL = 5  # seconds
+    ACTIVITY_LOG_BATCH_SIZE = 200  # queued entries that trigger an early flush
+    ACTIVITY_LOG_MAX_QUEUED = 10000  # entries beyond this are dropped and counted
+    # flask archive-activity-logs moves older entries to monthly NDJSON.gz files
+    ACTIVITY_LOG_RETENTION_DAYS = 90
+    ACTIVITY_LOG_ARCHIVE_DIR = os.environ.get('ACTIVITY_LOG_ARCHIVE_DIR')  # default: instance/activity-log-archive
+
+    # Fuzzy (trigram) case search: 'auto' uses pg_trgm on PostgreSQL when it
+    # can be enabled, otherwise an in-process index ('memory')
+    FUZZY_SEARCH_BACKEND = os.environ.get('FUZZY_SEARCH_BACKEND', 'auto')
+    FUZZY_SEARCH_THRESHOLD = 0.3
+    # Full reload interval of in-process case indexes, for writes made elsewhere
+    CASE_INDEX_REFRESH_SECONDS = 900
+    # Search facet counts, cached per normalized query
+    FACET_CACHE_SECONDS = 60
+    FACET_CACHE_SIZE = 1000
+    # Search result ids, cached per normalized query and filters
+    SEARCH_CACHE_SECONDS = 30
+    SEARCH_CACHE_SIZE = 5000
+    # Rendered pages for anonymous visitors
+    PAGE_CACHE_SECONDS = 60
+    PAGE_CACHE_SIZE = 500
+    # Browser cache lifetime of the pre-rendered content pages (about, faq, ...)
+    STATIC_PAGE_MAX_AGE = 86400
+    # Site-wide counters are recounted this often to correct drift from
+    # writes that bypass the ORM
+    STATS_RECONCILE_SECONDS = 3600
+    # Pending sighting reports are rescored this often, as their cases age
+    REPORT_PRIORITY_RESCORE_SECONDS = 900
+
     BCRYPT_LOG_ROUNDS = 12
 
     ITEMS_PER_PAGE = 20
+    # Largest number of reports or cases one bulk moderation request may change
+    BULK_MODERATION_MAX_ITEMS = 500
     EMAIL_VERIFICATION_EXPIRY = 3600
     PASSWORD_RESET_EXPIRY = 3600  
 
@@ -71,6 +123,7 @@ class TestingConfig(Config):
     TESTING = True
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_STRICT_LOADING = True
     WTF_CSRF_ENABLED = False
 
 
@@ -1,50 +1,58 @@
 from flask import render_template, request, jsonify, redirect, url_for, flash
 from flask_login import login_required, current_user
-from sqlalchemy import or_, and_, desc
+from sqlalchemy import desc
 from datetime import datetime, timedelta
 from app.main import bp
-from app.models.missing_person import MissingPerson, PersonPhoto
+from app.models.missing_person import MissingPerson
 from app.models.sighting import SightingReport
-from app.models.user import User
 from app.models.options import MissingPersonStatus, ReportStatus
+from app.models.loaders import view_options
+from app.utils.search import apply_search
+from app.utils.fuzzy import fuzzy_case_ids
+from app.utils.facets import AGE_BANDS, filter_age_band, search_facets
+from app.utils.stats import site_stats
+from app.utils.page_cache import cached_page
+from app.utils.static_pages import static_page
+from app.utils.view_counter import get_view_counter
+from app.utils.search_cache import search_key, cached_ids, hydrate, paginate_cached, paginate_keyset_cached
 from app.extensions import db
 
 
 @bp.route('/')
 @bp.route('/index')
+@cached_page()
 def index():
     recent_cases = MissingPerson.query.filter_by(
         is_public=True,
         status=MissingPersonStatus.MISSING
     ).order_by(desc(MissingPerson.created_at)).limit(6).all()
 
+    counts = site_stats()
     stats = {
-        'total_missing': MissingPerson.query.filter_by(status=MissingPersonStatus.MISSING).count(),
-        'total_found': MissingPerson.query.filter_by(status=MissingPersonStatus.FOUND).count(),
-        'active_reports': SightingReport.query.filter_by(status=ReportStatus.PENDING).count(),
-        'total_users': User.query.count()
+        'total_missing': counts['cases.missing'],
+        'total_found': counts['cases.found'],
+        'active_reports': counts['reports.pending'],
+        'total_users': counts['users']
     }
 
     return render_template('main/index.html', recent_cases=recent_cases, stats=stats)
 
 
 @bp.route('/browse')
+@cached_page()
 def browse():
     page = request.args.get('page', 1, type=int)
     search_query = request.args.get('q', '')
     status_filter = request.args.get('status', '')
     gender_filter = request.args.get('gender', '')
-    sort_by = request.args.get('sort', 'recent')
+    age_band_filter = request.args.get('age_band', '')
+    city_filter = request.args.get('city', '')
+    sort_by = request.args.get('sort', 'relevance' if search_query else 'recent')
 
     query = MissingPerson.query.filter_by(is_public=True)
 
     if search_query:
-        query = query.filter(
-            or_(
-                MissingPerson.full_name.ilike(f'%{search_query}%'),
-                MissingPerson.last_seen_location.ilike(f'%{search_query}%')
-            )
-        )
+        query = apply_search(query, search_query, ranked=(sort_by == 'relevance'))
 
     if status_filter:
         try:
@@ -56,18 +64,37 @@ def browse():
     if gender_filter:
         query = query.filter_by(gender=gender_filter)
 
-    if sort_by == 'recent':
-        query = query.order_by(desc(MissingPerson.created_at))
-    elif sort_by == 'oldest':
-        query = query.order_by(MissingPerson.created_at)
-    elif sort_by == 'last_seen':
-        query = query.order_by(desc(MissingPerson.last_seen_date))
+    if age_band_filter:
+        query = filter_age_band(query, age_band_filter)
+
+    if city_filter:
+        query = query.filter_by(last_seen_city=city_filter)
+
+    key = search_key('browse', search_query, status_filter, gender_filter,
+                     age_band_filter, city_filter, sort_by)
+    hydrate_query = MissingPerson.query.options(*view_options('browse'))
 
-    pagination = query.paginate(
-        page=page,
-        per_page=12,
-        error_out=False
-    )
+    if sort_by == 'relevance' and search_query:
+        # Rank order has no keyset; result sets are bounded by the query
+        pagination = paginate_cached(
+            query.order_by(desc(MissingPerson.created_at)), key,
+            page=page,
+            per_page=12,
+            hydrate_query=hydrate_query
+        )
+    else:
+        sort_column, descending = {
+            'oldest': (MissingPerson.created_at, False),
+            'last_seen': (MissingPerson.last_seen_date, True),
+        }.get(sort_by, (MissingPerson.created_at, True))
+        pagination = paginate_keyset_cached(
+            query, key, sort_column,
+            after=request.args.get('after'),
+            before=request.args.get('before'),
+            per_page=12,
+            descending=descending,
+            hydrate_query=hydrate_query
+        )
 
     return render_template('main/browse.html',
                          missing_persons=pagination.items,
@@ -75,12 +102,21 @@ def browse():
                          search_query=search_query,
                          status_filter=status_filter,
                          gender_filter=gender_filter,
+                         age_band_filter=age_band_filter,
+                         city_filter=city_filter,
+                         facets=search_facets(search_query),
+                         age_bands=AGE_BANDS,
                          sort_by=sort_by)
 
 
+def _count_cached_view(person_id):
+    get_view_counter().increment(person_id)
+
+
 @bp.route('/person/<int:person_id>')
+@cached_page(case_arg='person_id', on_hit=_count_cached_view)
 def person_detail(person_id):
-    person = MissingPerson.query.get_or_404(person_id)
+    person = MissingPerson.query.options(*view_options('person_detail')).get_or_404(person_id)
 
     if not person.is_public and (not current_user.is_authenticated or
                                  (current_user.id != person.reported_by and not current_user.is_admin())):
@@ -94,7 +130,7 @@ def person_detail(person_id):
         status=ReportStatus.VERIFIED
     ).order_by(desc(SightingReport.sighting_date)).all()
 
-    photos = PersonPhoto.query.filter_by(person_id=person_id).all()
+    photos = person.photo_list
     current_time = datetime.now()
     return render_template('main/person_detail.html',
                          person=person,
@@ -116,11 +152,13 @@ def report_sighting(person_id):
 
 
 @bp.route('/about')
+@static_page
 def about():
     return render_template('main/about.html')
 
 
 @bp.route('/contact')
+@static_page
 def contact():
     return render_template('main/contact.html')
 
@@ -128,31 +166,35 @@ def contact():
 @bp.route('/search')
 def search():
     query = request.args.get('q', '')
+    fuzzy = request.args.get('fuzzy', type=int) == 1
     if not query:
         return redirect(url_for('main.browse'))
 
-    results = MissingPerson.query.filter(
-        and_(
-            MissingPerson.is_public == True,
-            or_(
-                MissingPerson.full_name.ilike(f'%{query}%'),
-                MissingPerson.last_seen_location.ilike(f'%{query}%'),
-                MissingPerson.case_number.ilike(f'%{query}%')
-            )
-        )
-    ).order_by(desc(MissingPerson.created_at)).limit(20).all()
+    def compute():
+        if fuzzy:
+            return fuzzy_case_ids(query, 20)
+        return [row[0] for row in apply_search(
+            MissingPerson.query.filter(MissingPerson.is_public == True), query
+        ).with_entities(MissingPerson.id).order_by(desc(MissingPerson.created_at)).limit(20)]
+
+    results = hydrate(cached_ids(search_key('search', query, fuzzy), compute),
+                      MissingPerson.query.filter(MissingPerson.is_public == True))
 
-    return render_template('main/search_results.html', results=results, query=query)
+    return render_template('main/search_results.html', results=results, query=query, fuzzy=fuzzy)
 
 
 @bp.route('/dashboard')
 @login_required
 def dashboard():
-    user_reports = MissingPerson.query.filter_by(reported_by=current_user.id).order_by(
+    user_reports = MissingPerson.query.options(*view_options('dashboard_reports')).filter_by(
+        reported_by=current_user.id
+    ).order_by(
         desc(MissingPerson.created_at)
     ).all()
 
-    user_sightings = SightingReport.query.filter_by(reported_by=current_user.id).order_by(
+    user_sightings = SightingReport.query.options(*view_options('dashboard_sightings')).filter_by(
+        reported_by=current_user.id
+    ).order_by(
         desc(SightingReport.created_at)
     ).all()
 
@@ -167,11 +209,13 @@ def map_view():
 
 
 @bp.route('/statistics')
+@cached_page()
 def statistics():
-    total_cases = MissingPerson.query.count()
-    missing_count = MissingPerson.query.filter_by(status=MissingPersonStatus.MISSING).count()
-    found_count = MissingPerson.query.filter_by(status=MissingPersonStatus.FOUND).count()
-    investigating_count = MissingPerson.query.filter_by(status=MissingPersonStatus.INVESTIGATING).count()
+    counts = site_stats()
+    total_cases = counts['cases']
+    missing_count = counts['cases.missing']
+    found_count = counts['cases.found']
+    investigating_count = counts['cases.investigating']
 
     recent_found = MissingPerson.query.filter_by(
         status=MissingPersonStatus.FOUND
@@ -199,17 +243,21 @@ def internal_error(error):
     return render_template('errors/500.html'), 500
 
 @bp.route('/privacy')
+@static_page
 def privacy():
     return render_template('main/resources/privacy.html')
 
 @bp.route('/safety-tips')
+@static_page
 def safety():
     return render_template('main/resources/safety_tips.html')
 
 @bp.route('/terms-of-service')
+@static_page
 def terms():
     return render_template('main/resources/terms.html')
 
 @bp.route('/faq')
+@static_page
 def faq():
     return render_template('main/resources/faqs.html')
\ No newline at end of file
@@ -1,5 +1,8 @@
-from app.models.user import User
-from app.models.missing_person import MissingPerson, PersonPhoto
+from app.models.user import User, UserNameToken
+from app.models.missing_person import MissingPerson, PersonPhoto, PersonNameKey
 from app.models.sighting import SightingReport, SightingPhoto
+from app.models.audit import Notification, ActivityLog, Message, SystemSetting
+from app.models.stats import StatCounter, DailyRollup
+from app.models import events
 # from app.models.notification import Notification
 # from app.models.activity_log import ActivityLog
@@ -0,0 +1,378 @@
+"""
+ORM event hooks that keep denormalized MissingPerson columns, report
+priority scores, the site-wide stat counters and the daily rollups
+current, and send app.signals.case_changed once case writes are committed.
+"""
+from collections import Counter
+from datetime import datetime
+from itertools import chain
+from flask import current_app, has_app_context
+from sqlalchemy import event, select, update, delete, insert, bindparam, inspect, func
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from app.models.missing_person import MissingPerson, PersonPhoto, PersonNameKey, city_from_location
+from app.models.sighting import SightingReport, SightingPhoto
+from app.models.user import User
+from app.models.options import MissingPersonStatus, ReportStatus
+from app.utils.storage import get_storage, photo_storage_key
+from app.utils.phonetic import name_keys, name_phonetic
+from app.utils.measurements import parse_height_cm, parse_weight_kg
+from app.utils.stats import person_metrics, report_metrics, apply_stat_deltas
+from app.utils.rollups import person_rollups, report_rollups, user_rollups, apply_rollup_deltas
+from app.utils.report_priority import score_reports
+from app.utils.user_search import normalize, refresh_user_tokens
+from app.signals import case_changed
+
+
+def update_person_columns(connection, values, session=None):
+    """
+    Executemany UPDATE of derived MissingPerson columns.
+
+    values maps person id -> {column: value}, every dict with the same keys.
+    When a session is given, instances it has loaded are synced in place.
+    """
+    if not values:
+        return
+
+    table = MissingPerson.__table__
+    columns = list(next(iter(values.values())))
+    connection.execute(
+        update(table)
+        .where(table.c.id == bindparam('b_id'))
+        # Keep updated_at untouched; this is derived data
+        .values(updated_at=table.c.updated_at,
+                **{column: bindparam(f'b_{column}') for column in columns}),
+        [{'b_id': pid, **{f'b_{column}': row[column] for column in columns}}
+         for pid, row in values.items()]
+    )
+
+    if session is None:
+        return
+    for pid, row in values.items():
+        person = session.identity_map.get(session.identity_key(MissingPerson, pid))
+        if person is not None:
+            for column, value in row.items():
+                set_committed_value(person, column, value)
+
+
+def refresh_primary_photos(session, person_ids):
+    """
+    Resolve primary_photo_id / primary_photo_url for the given persons.
+
+    The primary photo is the is_primary one, else the oldest; photos whose
+    file is missing from storage are skipped in favour of one that exists.
+    """
+    person_ids = set(person_ids)
+    if not person_ids:
+        return
+
+    storage = get_storage()
+    connection = session.connection()
+    rows = connection.execute(
+        select(PersonPhoto.id, PersonPhoto.person_id, PersonPhoto.filename, PersonPhoto.file_path)
+        .where(PersonPhoto.person_id.in_(person_ids))
+        .order_by(PersonPhoto.person_id, PersonPhoto.is_primary.desc(), PersonPhoto.id)
+    ).all()
+
+    resolved = {person_id: (None, None) for person_id in person_ids}
+    for photo_id, person_id, filename, file_path in rows:
+        current_id, current_url = resolved[person_id]
+        if current_url:
+            continue
+        key = photo_storage_key(file_path, filename)
+        if storage.is_stored(key):
+            resolved[person_id] = (photo_id, storage.url(key))
+        elif current_id is None:
+            resolved[person_id] = (photo_id, None)
+
+    update_person_columns(connection, {
+        pid: {'primary_photo_id': photo_id, 'primary_photo_url': url}
+        for pid, (photo_id, url) in resolved.items()
+    }, session)
+
+
+def case_counter_values(connection, person_ids=None):
+    """
+    Compute photo_count, verified_sighting_count and last_verified_sighting_at
+    with one grouped query per table. person_ids=None covers every case.
+
+    Returns {person_id: {column: value}} for the persons that have any
+    photos or verified sightings; absent persons have zero counts.
+    """
+    photo_query = (
+        select(PersonPhoto.person_id, func.count(PersonPhoto.id))
+        .group_by(PersonPhoto.person_id)
+    )
+    sighting_query = (
+        select(SightingReport.missing_person_id,
+               func.count(SightingReport.id),
+               func.max(SightingReport.sighting_date))
+        .where(SightingReport.status == ReportStatus.VERIFIED)
+        .group_by(SightingReport.missing_person_id)
+    )
+    if person_ids is not None:
+        photo_query = photo_query.where(PersonPhoto.person_id.in_(person_ids))
+        sighting_query = sighting_query.where(SightingReport.missing_person_id.in_(person_ids))
+
+    counters = {}
+    for person_id, count in connection.execute(photo_query):
+        counters[person_id] = empty_case_counters()
+        counters[person_id]['photo_count'] = count
+    for person_id, count, latest in connection.execute(sighting_query):
+        row = counters.setdefault(person_id, empty_case_counters())
+        row['verified_sighting_count'] = count
+        row['last_verified_sighting_at'] = latest
+    return counters
+
+
+def empty_case_counters():
+    return {'photo_count': 0, 'verified_sighting_count': 0, 'last_verified_sighting_at': None}
+
+
+def refresh_case_counters(session, person_ids):
+    """Recompute the denormalized counters of the given persons"""
+    person_ids = set(person_ids)
+    if not person_ids:
+        return
+
+    connection = session.connection()
+    counters = case_counter_values(connection, person_ids)
+    update_person_columns(connection, {
+        pid: counters.get(pid) or empty_case_counters() for pid in person_ids
+    }, session)
+
+
+def refresh_name_keys(session, names, deleted_ids=()):
+    """
+    Rewrite name_phonetic and the person_name_keys rows of the given persons.
+
+    names maps person id -> full_name; keys of deleted_ids are dropped.
+    """
+    person_ids = set(names) | set(deleted_ids)
+    if not person_ids:
+        return
+
+    connection = session.connection()
+    connection.execute(delete(PersonNameKey.__table__).where(PersonNameKey.person_id.in_(person_ids)))
+    rows = [{'person_id': pid, 'key': key} for pid, name in names.items() for key in name_keys(name)]
+    if rows:
+        connection.execute(insert(PersonNameKey.__table__), rows)
+
+    update_person_columns(connection, {
+        pid: {'name_phonetic': name_phonetic(name)} for pid, name in names.items()
+    }, session)
+
+
+def _renamed_persons(session):
+    """{id: full_name} of persons inserted or renamed in this flush, and deleted ids"""
+    names = {}
+    for obj in chain(session.new, session.dirty):
+        if isinstance(obj, MissingPerson) and (
+                obj in session.new or inspect(obj).attrs.full_name.history.has_changes()):
+            names[obj.id] = obj.full_name
+    deleted = {obj.id for obj in session.deleted if isinstance(obj, MissingPerson)}
+    return names, deleted
+
+
+def refresh_cities(session, locations):
+    """Set last_seen_city from the given {person id: last_seen_location}"""
+    update_person_columns(session.connection(), {
+        pid: {'last_seen_city': city_from_location(location)} for pid, location in locations.items()
+    }, session)
+
+
+def refresh_measurements(session, measurements):
+    """Set height_cm/weight_kg from the given {person id: (height, weight)}"""
+    update_person_columns(session.connection(), {
+        pid: {'height_cm': parse_height_cm(height), 'weight_kg': parse_weight_kg(weight)}
+        for pid, (height, weight) in measurements.items()
+    }, session)
+
+
+def _changed_persons(session, *attrs):
+    """Persons inserted in this flush or with one of attrs changed"""
+    return [
+        obj for obj in chain(session.new, session.dirty)
+        if isinstance(obj, MissingPerson) and (
+            obj in session.new or any(inspect(obj).attrs[attr].history.has_changes() for attr in attrs))
+    ]
+
+
+def _affected_person_ids(session, model, person_attr, watched):
+    """
+    Persons whose model rows were inserted, deleted, or had one of the
+    watched attributes changed in this flush (old and new owner on a move).
+    """
+    person_ids = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if not isinstance(obj, model):
+            continue
+        state = inspect(obj)
+        if obj in session.dirty:
+            changed = [attr for attr in watched if state.attrs[attr].history.has_changes()]
+            if not changed:
+                continue
+            person_ids.update(state.attrs[person_attr].history.deleted)
+        person_id = getattr(obj, person_attr)
+        if person_id is not None:
+            person_ids.add(person_id)
+    return person_ids
+
+
+def _changed(session, model, *attrs):
+    """Rows of model updated in this flush with one of attrs changed"""
+    return [
+        obj for obj in session.dirty
+        if isinstance(obj, model) and any(inspect(obj).attrs[attr].history.has_changes() for attr in attrs)
+    ]
+
+
+def _unscored_reports(session):
+    """
+    (report ids, person ids, reporter ids) whose priority factors changed in
+    this flush: new or moved reports, photos added or removed, cases whose
+    age, last-seen date or coordinates changed, reporters (un)verified.
+    """
+    report_ids = {obj.id for obj in session.new if isinstance(obj, SightingReport)}
+    report_ids.update(obj.id for obj in _changed(
+        session, SightingReport, 'missing_person_id', 'reported_by', 'latitude', 'longitude'))
+    report_ids.update(obj.sighting_id for obj in chain(session.new, session.deleted)
+                      if isinstance(obj, SightingPhoto))
+    person_ids = {obj.id for obj in _changed(
+        session, MissingPerson, 'is_minor', 'last_seen_date', 'latitude', 'longitude')}
+    reporter_ids = {obj.id for obj in _changed(session, User, 'is_verified')}
+    return report_ids, person_ids, reporter_ids
+
+
+STAT_SOURCES = {
+    MissingPerson: (('status', 'is_public', 'is_minor'), person_metrics),
+    SightingReport: (('status',), report_metrics),
+    User: ((), lambda: ['users']),
+}
+
+
+def _committed_value(state, attr):
+    history = state.attrs[attr].history
+    return history.deleted[0] if history.deleted else state.attrs[attr].value
+
+
+ROLLUP_SOURCES = {
+    MissingPerson: (('created_at', 'found_date', 'closed_at'), person_rollups),
+    SightingReport: (('created_at', 'status', 'verified_at'), report_rollups),
+    User: (('created_at',), user_rollups),
+}
+
+
+def _deltas(session, sources):
+    """
+    {key: delta} for the rows inserted, deleted or moved between keys in
+    this flush, where sources maps a model to (attrs, keys(*attr values)).
+    """
+    deltas = Counter()
+    for kind, objects in (('new', session.new), ('dirty', session.dirty), ('deleted', session.deleted)):
+        for obj in objects:
+            source = sources.get(type(obj))
+            if source is None:
+                continue
+            attrs, keys = source
+            state = inspect(obj)
+            if kind == 'dirty' and not any(state.attrs[attr].history.has_changes() for attr in attrs):
+                continue
+            if kind != 'new':
+                deltas.subtract(keys(*(_committed_value(state, attr) for attr in attrs)))
+            if kind != 'deleted':
+                deltas.update(keys(*(getattr(obj, attr) for attr in attrs)))
+    return deltas
+
+
+@event.listens_for(Session, 'before_flush')
+def _stamp_status_dates(session, flush_context, instances):
+    """Date cases as they become found or closed, for the daily rollups"""
+    for obj in chain(session.new, session.dirty):
+        if not isinstance(obj, MissingPerson):
+            continue
+        if obj.status == MissingPersonStatus.FOUND and obj.found_date is None:
+            obj.found_date = datetime.now()
+        elif obj.status == MissingPersonStatus.CLOSED and obj.closed_at is None:
+            obj.closed_at = datetime.now()
+
+
+@event.listens_for(Session, 'before_flush')
+def _normalize_user_search(session, flush_context, instances):
+    """Keep the lowercased username/email used by the admin user search"""
+    for obj in chain(session.new, session.dirty):
+        if isinstance(obj, User):
+            obj.username_lower = normalize(obj.username)
+            obj.email_lower = normalize(obj.email)
+
+
+@event.listens_for(Session, 'after_flush')
+def _after_flush(session, flush_context):
+    _record_case_changes(session)
+    apply_stat_deltas(session.connection(), _deltas(session, STAT_SOURCES))
+    apply_rollup_deltas(session.connection(), _deltas(session, ROLLUP_SOURCES))
+
+    names, deleted_persons = _renamed_persons(session)
+    if names or deleted_persons:
+        refresh_name_keys(session, names, deleted_persons)
+    renamed_users = [obj for obj in session.new if isinstance(obj, User)] + _changed(session, User, 'full_name')
+    deleted_users = {obj.id for obj in session.deleted if isinstance(obj, User)}
+    if renamed_users or deleted_users:
+        refresh_user_tokens(session.connection(), {obj.id: obj.full_name for obj in renamed_users},
+                            deleted_users)
+    relocated = _changed_persons(session, 'last_seen_location')
+    if relocated:
+        refresh_cities(session, {obj.id: obj.last_seen_location for obj in relocated})
+    measured = _changed_persons(session, 'height', 'weight')
+    if measured:
+        refresh_measurements(session, {obj.id: (obj.height, obj.weight) for obj in measured})
+
+    photo_persons = _affected_person_ids(
+        session, PersonPhoto, 'person_id', ('is_primary', 'file_path', 'person_id'))
+    # verify_report / reject_report change status; reassignments and deletes
+    # (including cascades from a deleted case) are covered as well
+    sighting_persons = _affected_person_ids(
+        session, SightingReport, 'missing_person_id', ('status', 'sighting_date', 'missing_person_id'))
+
+    report_ids, person_ids, reporter_ids = _unscored_reports(session)
+    if report_ids or person_ids or reporter_ids:
+        score_reports(session.connection(), report_ids, person_ids, reporter_ids, session)
+
+    if photo_persons:
+        refresh_primary_photos(session, photo_persons)
+    if photo_persons or sighting_persons:
+        refresh_case_counters(session, photo_persons | sighting_persons)
+        # Their pages show the photos and verified sightings
+        _pending_case_changes(session)['updated'].update(photo_persons | sighting_persons)
+
+
+def _pending_case_changes(session):
+    return session.info.setdefault('case_changes', {'created': set(), 'updated': set(), 'deleted': set()})
+
+
+def _record_case_changes(session):
+    """Remember which cases this flush touched, for case_changed after commit"""
+    changes = None
+    for kind, objects in (('created', session.new), ('updated', session.dirty), ('deleted', session.deleted)):
+        for obj in objects:
+            if not isinstance(obj, MissingPerson):
+                continue
+            if kind == 'updated' and not session.is_modified(obj, include_collections=False):
+                continue
+            changes = changes or _pending_case_changes(session)
+            changes[kind].add(obj.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _after_commit(session):
+    changes = session.info.pop('case_changes', None)
+    if not changes or not has_app_context():
+        return
+    # A case created and edited in the same transaction is just created
+    changes['updated'] -= changes['created'] | changes['deleted']
+    case_changed.send(current_app._get_current_object(), **changes)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _after_soft_rollback(session, previous_transaction):
+    session.info.pop('case_changes', None)
@@ -0,0 +1,47 @@
+"""
+Relationship loading presets per view.
+
+The collection relationships on MissingPerson and User are lazy='dynamic',
+which always issues a query per access and can never be eager-loaded, so
+each has an eager-loadable ``*_list`` variant. Views build their queries
+with ``view_options('<view>')`` so everything a template touches is loaded
+up front. With SQLALCHEMY_STRICT_LOADING enabled, any relationship a view
+reaches that its preset did not load raises instead of emitting a query.
+"""
+from flask import current_app
+from sqlalchemy.orm import joinedload, selectinload, raiseload
+from app.models.missing_person import MissingPerson
+from app.models.sighting import SightingReport
+from app.models.user import User
+
+LOADER_PRESETS = {
+    # Case cards only read MissingPerson columns; the photo URL is denormalized
+    'browse': (),
+    'person_detail': (
+        selectinload(MissingPerson.photo_list),
+    ),
+    'dashboard_reports': (),
+    'dashboard_sightings': (),
+    'admin_dashboard_reports': (
+        joinedload(SightingReport.missing_person),
+    ),
+    'admin_reports': (
+        joinedload(SightingReport.missing_person),
+        joinedload(SightingReport.reporter),
+    ),
+    'admin_user_detail': (
+        selectinload(User.missing_person_list),
+        selectinload(User.sighting_report_list).joinedload(SightingReport.missing_person),
+    ),
+    'map_sightings': (
+        joinedload(SightingReport.missing_person),
+    ),
+}
+
+
+def view_options(view):
+    """Loader options for a view, plus raiseload when strict loading is on"""
+    options = list(LOADER_PRESETS[view])
+    if current_app.config.get('SQLALCHEMY_STRICT_LOADING'):
+        options.append(raiseload('*', sql_only=True))
+    return options
@@ -1,12 +1,52 @@
 from app.extensions import db
 from app.models.options import MissingPersonStatus
 from datetime import datetime
-import os, random
-from flask import current_app, url_for
+import random
+from app.utils.storage import get_storage, photo_storage_key
+from app.utils.view_counter import get_view_counter
+
+
+def fallback_image_url(person_id, full_name, gender):
+    """Gender-based avatar for a person without a usable photo, stable per person"""
+    gender = (gender or 'unknown').strip().lower()
+    name_seed = (full_name or 'User').split()[0]
+    seed = f"{name_seed}{person_id or ''}"
+
+    fallback_sources = {
+        'male': [
+            f"https://api.dicebear.com/9.x/adventurer/png?seed={seed}",
+            f"https://randomuser.me/api/portraits/men/{(person_id or 0) % 99 + 1}.jpg",
+        ],
+        'female': [
+            f"https://api.dicebear.com/9.x/adventurer/png?seed={seed}",
+            f"https://randomuser.me/api/portraits/women/{(person_id or 0) % 99 + 1}.jpg",
+        ],
+        'unknown': [
+            f"https://api.dicebear.com/9.x/identicon/png?seed={seed}",
+        ]
+    }
+
+    sources = fallback_sources.get(gender, fallback_sources['unknown'])
+    return sources[(person_id or 0) % len(sources)]
+
+
+def city_from_location(location):
+    """City of a free-text location: its last comma-separated part ("CBD, Nairobi" -> "Nairobi")"""
+    city = (location or '').rsplit(',', 1)[-1].strip()
+    return city.title()[:100] or None
 
 
 class MissingPerson(db.Model):
     __tablename__ = 'missing_persons'
+    __table_args__ = (
+        # Attribute search: equality on gender, then age and height ranges
+        db.Index('ix_missing_persons_attributes', 'gender', 'age', 'height_cm'),
+        db.Index('ix_missing_persons_coordinates', 'latitude', 'longitude'),
+        # Keyset pagination of the admin list and the public browse orders
+        db.Index('ix_missing_persons_created_id', 'created_at', 'id'),
+        db.Index('ix_missing_persons_public_created_id', 'is_public', 'created_at', 'id'),
+        db.Index('ix_missing_persons_public_last_seen_id', 'is_public', 'last_seen_date', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     
@@ -17,12 +57,17 @@ class MissingPerson(db.Model):
     
     height = db.Column(db.String(20), nullable=True)
     weight = db.Column(db.String(20), nullable=True)
+    # Parsed from height/weight on write (see app.utils.measurements)
+    height_cm = db.Column(db.Float, nullable=True)
+    weight_kg = db.Column(db.Float, nullable=True)
     hair_color = db.Column(db.String(50), nullable=True)
     eye_color = db.Column(db.String(50), nullable=True)
     skin_tone = db.Column(db.String(50), nullable=True)
     distinguishing_features = db.Column(db.Text, nullable=True)
     
     last_seen_location = db.Column(db.String(255), nullable=False)
+    # Derived from last_seen_location on write (see app.models.events)
+    last_seen_city = db.Column(db.String(100), nullable=True, index=True)
     last_seen_date = db.Column(db.DateTime, nullable=False, index=True)
     last_seen_wearing = db.Column(db.Text, nullable=True)
     circumstances = db.Column(db.Text, nullable=True)
@@ -50,92 +95,54 @@ class MissingPerson(db.Model):
     
     created_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
-    found_date = db.Column(db.DateTime, nullable=True)
+    found_date = db.Column(db.DateTime, nullable=True, index=True)
+    closed_at = db.Column(db.DateTime, nullable=True, index=True)
     
     view_count = db.Column(db.Integer, default=0, nullable=False)
+
+    # Denormalized primary photo, maintained on photo writes (no FK to avoid a
+    # cycle with person_photos). The URL is only set when the file exists.
+    primary_photo_id = db.Column(db.Integer, nullable=True)
+    primary_photo_url = db.Column(db.String(500), nullable=True)
+
+    # Denormalized counters, maintained by ORM events (see app.models.events)
+    verified_sighting_count = db.Column(db.Integer, default=0, nullable=False)
+    photo_count = db.Column(db.Integer, default=0, nullable=False)
+    last_verified_sighting_at = db.Column(db.DateTime, nullable=True)
+
+    # Sorted phonetic keys of full_name (see app.utils.phonetic), for duplicate
+    # checks; per-word keys live in person_name_keys
+    name_phonetic = db.Column(db.String(128), nullable=True, index=True)
     
     photos = db.relationship('PersonPhoto', backref='person', lazy='dynamic', 
                            cascade='all, delete-orphan')
     sighting_reports = db.relationship('SightingReport', backref='missing_person', 
                                       lazy='dynamic', cascade='all, delete-orphan')
+
+    # Eager-loadable variants of the dynamic collections above (see app.models.loaders)
+    photo_list = db.relationship('PersonPhoto', viewonly=True, order_by='PersonPhoto.id')
+    sighting_report_list = db.relationship('SightingReport', viewonly=True,
+                                           order_by='desc(SightingReport.created_at)')
     
     @property
     def display_image_url(self):
         """
-        Returns a usable photo URL or a fallback avatar.
-        - Checks both DB record and actual file existence.
-        - Gracefully handles missing files and OS errors.
-        - Uses gender-based random avatar as fallback.
+        Returns the cached primary photo URL or a fallback avatar.
+        - primary_photo_url is resolved when photos are written (see app.models.events),
+          so rendering never queries photos or touches storage.
+        - Falls back to a gender-based avatar that is stable per person.
         """
-        try:
-            # Use Flask's configured static folder (portable across environments)
-            static_folder = current_app.static_folder
-            upload_dir = os.path.join(static_folder, 'uploads')
-
-            # 1️⃣ Check if the person has an uploaded photo record
-            first_photo = self.photos.first()
-            if first_photo:
-                photo_path = os.path.join(upload_dir, first_photo.filename)
-                if os.path.isfile(photo_path):  # safer and faster than os.path.exists
-                    return url_for('static', filename=f'uploads/{first_photo.filename}')
-
-                # Log the missing file for admin awareness
-                current_app.logger.warning(
-                    f"Photo file missing for MissingPerson ID {self.id}: {photo_path}"
-                )
-
-            # 2️⃣ Build a robust fallback (always succeeds)
-            gender = (self.gender or 'unknown').strip().lower()
-            name_seed = (self.full_name or 'User').split()[0]
-
-            fallback_sources = {
-                'male': [
-                    f"https://api.dicebear.com/9.x/adventurer/png?seed={name_seed}",
-                    f"https://randomuser.me/api/portraits/men/{random.randint(1, 99)}.jpg",
-                ],
-                'female': [
-                    f"https://api.dicebear.com/9.x/adventurer/png?seed={name_seed}",
-                    f"https://randomuser.me/api/portraits/women/{random.randint(1, 99)}.jpg",
-                ],
-                'unknown': [
-                    f"https://api.dicebear.com/9.x/identicon/png?seed={name_seed}",
-                ]
-            }
-
-            # 3️⃣ Pick a random fallback based on gender, or default to unknown
-            url = random.choice(fallback_sources.get(gender, fallback_sources['unknown']))
-
-            # Optional: add a static local fallback if external APIs fail
-            if not url:
-                if gender == 'male':
-                    url = url_for('static', filename='assets/male_placeholder.png')
-
-                elif gender == 'female':
-                    url = url_for('static', filename='assets/missing_placeholder.png')
-                else:
-                    url = url_for('static', filename='assets/blank_face.png')
-            return url
-
-        except Exception as e:
-            # 4️⃣ Catch-all safeguard (should never propagate to Jinja)
-            current_app.logger.error(
-                f"Error resolving display_image_url for MissingPerson ID {self.id}: {e}",
-                exc_info=True
-            )
-            # Always provide a working final fallback
-            return url_for('static', filename='images/default_unknown.png')
+        return self.primary_photo_url or fallback_image_url(self.id, self.full_name, self.gender)
         
     @property
     def display_photos(self):
         """Return up to 4 valid photo URLs or random fallbacks."""
-        upload_dir = os.path.join('app', 'static', 'uploads')
+        storage = get_storage()
 
         photos = []
-        if hasattr(self, 'photos') and self.photos:
-            for photo in self.photos:
-                photo_path = os.path.join(upload_dir, photo.filename)
-                if os.path.exists(photo_path):
-                    photos.append(url_for('static', filename=f'uploads/{photo.filename}'))
+        for photo in self.photo_list:
+            if storage.is_stored(photo.storage_key):
+                photos.append(storage.url(photo.storage_key))
 
         # If none exist, generate random placeholders
         if not photos:
@@ -168,9 +175,13 @@ class MissingPerson(db.Model):
 
     
     def increment_views(self):
-        """Increment view counter"""
-        self.view_count += 1
-        db.session.commit()
+        """Record a view; buffered and flushed in batches by the view counter"""
+        get_view_counter().increment(self.id)
+
+    @property
+    def total_views(self):
+        """Stored view count plus views not flushed yet"""
+        return get_view_counter().total(self.id, self.view_count)
     
     def mark_as_found(self):
         """Mark person as found"""
@@ -197,6 +208,31 @@ class PersonPhoto(db.Model):
     caption = db.Column(db.String(255), nullable=True)
     
     uploaded_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
+
+    @property
+    def storage_key(self):
+        """Storage key of the file, resolving paths saved before sharding"""
+        return photo_storage_key(self.file_path, self.filename)
+
+    @property
+    def url(self):
+        return get_storage().url(self.storage_key)
     
     def __repr__(self):
-        return f'<PersonPhoto {self.filename}>'
\ No newline at end of file
+        return f'<PersonPhoto {self.filename}>'
+
+
+class PersonNameKey(db.Model):
+    """One phonetic key per name word, for indexed sound-alike lookups"""
+    __tablename__ = 'person_name_keys'
+    __table_args__ = (
+        db.Index('ix_person_name_keys_key_person', 'key', 'person_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    person_id = db.Column(db.Integer, db.ForeignKey('missing_persons.id', ondelete='CASCADE'),
+                          nullable=False, index=True)
+    key = db.Column(db.String(16), nullable=False)
+
+    def __repr__(self):
+        return f'<PersonNameKey {self.key}>'
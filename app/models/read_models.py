@@ -0,0 +1,192 @@
+"""
+Column-projected read models for the JSON APIs.
+
+Listing endpoints only emit a handful of fields per case, so instead of
+hydrating full MissingPerson entities (with their large Text columns, the
+identity map and change tracking) they select just the columns they need
+into slotted dataclasses:
+
+    cases = RecentCase.fetch(query.order_by(...).limit(6))
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import ClassVar, Optional
+from sqlalchemy import func
+from app.models.missing_person import MissingPerson, fallback_image_url
+from app.models.options import MissingPersonStatus
+from app.utils.view_counter import get_view_counter
+
+
+class ReadModel:
+    __slots__ = ()
+    columns: ClassVar[tuple] = ()
+
+    @classmethod
+    def fetch(cls, query):
+        """Run a MissingPerson query projected onto this model's columns"""
+        return [cls(*row) for row in query.with_entities(*cls.columns)]
+
+
+@dataclass(slots=True, frozen=True)
+class CaseSearchResult(ReadModel):
+    id: int
+    full_name: str
+    age: Optional[int]
+    last_seen_location: str
+    status: MissingPersonStatus
+
+    columns: ClassVar[tuple] = (
+        MissingPerson.id, MissingPerson.full_name, MissingPerson.age,
+        MissingPerson.last_seen_location, MissingPerson.status,
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'full_name': self.full_name,
+            'age': self.age,
+            'last_seen_location': self.last_seen_location,
+            'status': self.status.value
+        }
+
+
+@dataclass(slots=True, frozen=True)
+class RecentCase(ReadModel):
+    id: int
+    full_name: str
+    age: Optional[int]
+    last_seen_location: str
+    last_seen_date: Optional[datetime]
+    primary_photo_url: Optional[str]
+
+    columns: ClassVar[tuple] = (
+        MissingPerson.id, MissingPerson.full_name, MissingPerson.age,
+        MissingPerson.last_seen_location, MissingPerson.last_seen_date,
+        MissingPerson.primary_photo_url,
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'full_name': self.full_name,
+            'age': self.age,
+            'last_seen_location': self.last_seen_location,
+            'last_seen_date': self.last_seen_date.isoformat() if self.last_seen_date else None,
+            'photo_url': self.primary_photo_url
+        }
+
+
+@dataclass(slots=True, frozen=True)
+class MapPoint(ReadModel):
+    id: int
+    full_name: str
+    latitude: float
+    longitude: float
+    last_seen_location: str
+    last_seen_date: Optional[datetime]
+
+    columns: ClassVar[tuple] = (
+        MissingPerson.id, MissingPerson.full_name, MissingPerson.latitude,
+        MissingPerson.longitude, MissingPerson.last_seen_location, MissingPerson.last_seen_date,
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.full_name,
+            'lat': self.latitude,
+            'lng': self.longitude,
+            'location': self.last_seen_location,
+            'date': self.last_seen_date.isoformat() if self.last_seen_date else None
+        }
+
+
+@dataclass(slots=True, frozen=True)
+class MapMarker(ReadModel):
+    id: int
+    full_name: str
+    age: Optional[int]
+    gender: Optional[str]
+    status: MissingPersonStatus
+    case_number: Optional[str]
+    latitude: float
+    longitude: float
+    last_seen_location: str
+    last_seen_date: datetime
+    is_minor: bool
+    is_verified: bool
+    primary_photo_url: Optional[str]
+    verified_sighting_count: int
+    view_count: int
+    description: Optional[str]
+
+    columns: ClassVar[tuple] = (
+        MissingPerson.id, MissingPerson.full_name, MissingPerson.age, MissingPerson.gender,
+        MissingPerson.status, MissingPerson.case_number, MissingPerson.latitude,
+        MissingPerson.longitude, MissingPerson.last_seen_location, MissingPerson.last_seen_date,
+        MissingPerson.is_minor, MissingPerson.is_verified, MissingPerson.primary_photo_url,
+        MissingPerson.verified_sighting_count, MissingPerson.view_count,
+        # Only the marker popup excerpt is read, so truncate in SQL
+        func.substr(MissingPerson.circumstances, 1, 200),
+    )
+
+    def to_dict(self, now=None):
+        now = now or datetime.now()
+        return {
+            'id': self.id,
+            'type': 'missing_person',
+            'lat': self.latitude,
+            'lng': self.longitude,
+            'name': self.full_name,
+            'age': self.age,
+            'gender': self.gender,
+            'status': self.status.value,
+            'case_number': self.case_number,
+            'last_seen_location': self.last_seen_location,
+            'last_seen_date': self.last_seen_date.isoformat(),
+            'days_missing': (now - self.last_seen_date).days,
+            'is_minor': self.is_minor,
+            'is_verified': self.is_verified,
+            'photo_url': self.primary_photo_url or fallback_image_url(self.id, self.full_name, self.gender),
+            'sighting_count': self.verified_sighting_count,
+            'view_count': get_view_counter().total(self.id, self.view_count),
+            'description': self.description or None
+        }
+
+
+@dataclass(slots=True, frozen=True)
+class AttributeMatch(ReadModel):
+    id: int
+    full_name: str
+    case_number: Optional[str]
+    age: Optional[int]
+    gender: Optional[str]
+    height_cm: Optional[float]
+    weight_kg: Optional[float]
+    last_seen_location: str
+    last_seen_date: Optional[datetime]
+    latitude: Optional[float]
+    longitude: Optional[float]
+    primary_photo_url: Optional[str]
+
+    columns: ClassVar[tuple] = (
+        MissingPerson.id, MissingPerson.full_name, MissingPerson.case_number, MissingPerson.age,
+        MissingPerson.gender, MissingPerson.height_cm, MissingPerson.weight_kg,
+        MissingPerson.last_seen_location, MissingPerson.last_seen_date,
+        MissingPerson.latitude, MissingPerson.longitude, MissingPerson.primary_photo_url,
+    )
+
+    def to_dict(self, distance_km=None):
+        return {
+            'id': self.id,
+            'full_name': self.full_name,
+            'case_number': self.case_number,
+            'age': self.age,
+            'gender': self.gender,
+            'height_cm': self.height_cm,
+            'weight_kg': self.weight_kg,
+            'last_seen_location': self.last_seen_location,
+            'last_seen_date': self.last_seen_date.isoformat() if self.last_seen_date else None,
+            'distance_km': round(distance_km, 1) if distance_km is not None else None,
+            'photo_url': self.primary_photo_url or fallback_image_url(self.id, self.full_name, self.gender)
+        }
@@ -1,9 +1,16 @@
 from app.extensions import db
 from app.models.options import ReportStatus
+from app.utils.storage import get_storage, photo_storage_key
 from datetime import datetime
 
 class SightingReport(db.Model):
     __tablename__ = 'sighting_reports'
+    __table_args__ = (
+        db.Index('ix_sighting_reports_created_id', 'created_at', 'id'),
+        db.Index('ix_sighting_reports_status_created_id', 'status', 'created_at', 'id'),
+        # Moderation queue: pending reports by priority
+        db.Index('ix_sighting_reports_status_priority_id', 'status', 'priority_score', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     
@@ -28,26 +35,29 @@ class SightingReport(db.Model):
                       nullable=False, index=True)
     verified_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
     verification_notes = db.Column(db.Text, nullable=True)
+    # Moderation priority, see app.utils.report_priority
+    priority_score = db.Column(db.Float, default=0, nullable=False)
     
     created_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
-    verified_at = db.Column(db.DateTime, nullable=True)
+    verified_at = db.Column(db.DateTime, nullable=True, index=True)
     
     photos = db.relationship('SightingPhoto', backref='sighting', lazy='dynamic',
                            cascade='all, delete-orphan')
     
-    def verify_report(self, admin_id, notes=None):
-        self.status = ReportStatus.VERIFIED
+    def review(self, status, admin_id, notes=None):
+        """Record a moderator's decision; the caller commits"""
+        self.status = status
         self.verified_by = admin_id
         self.verification_notes = notes
         self.verified_at = datetime.now()
+
+    def verify_report(self, admin_id, notes=None):
+        self.review(ReportStatus.VERIFIED, admin_id, notes)
         db.session.commit()
     
     def reject_report(self, admin_id, notes=None):
-        self.status = ReportStatus.REJECTED
-        self.verified_by = admin_id
-        self.verification_notes = notes
-        self.verified_at = datetime.now()
+        self.review(ReportStatus.REJECTED, admin_id, notes)
         db.session.commit()
     
     def __repr__(self):
@@ -67,27 +77,27 @@ class SightingPhoto(db.Model):
     
     uploaded_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
 
+    @property
+    def storage_key(self):
+        """Storage key of the file, resolving paths saved before sharding"""
+        return photo_storage_key(self.file_path, self.filename, 'sightings')
+
     def get_display_url(self):
         """
-        Returns the local static URL if the file exists on the server.
+        Returns the storage URL if the file exists in upload storage.
         Otherwise, returns a fallback image from an external API.
         """
-        from flask import url_for
-        import os
         try:
-            # 1. Construct the absolute file system path to check existence
-            # Assuming 'static' is your static folder and file_path is relative to it
-            full_path = os.path.join('static', self.file_path)
-
-            # 2. Check if file exists locally
-            if os.path.exists(full_path):
-                return url_for('static', filename=self.file_path)
+            # 1. Check the file exists in upload storage
+            storage = get_storage()
+            if storage.is_stored(self.storage_key):
+                return storage.url(self.storage_key)
             
         except Exception:
             # Fallback if contexts aren't set up or pathing fails
             pass
 
-        # 3. Return API Fallback Image if local file is missing
+        # 2. Return API Fallback Image if local file is missing
         # We use the photo ID as a 'seed' so the image is consistent for this specific record
         return f"https://picsum.photos/seed/{self.id}/800/600"
     
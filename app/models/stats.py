@@ -0,0 +1,32 @@
+from datetime import datetime
+from app.extensions import db
+
+
+class StatCounter(db.Model):
+    """
+    A site-wide count kept current by the ORM hooks in app.models.events
+    and corrected by app.utils.stats.reconcile_stats().
+    """
+    __tablename__ = 'stat_counters'
+
+    metric = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+    def __repr__(self):
+        return f'<StatCounter {self.metric}={self.value}>'
+
+
+class DailyRollup(db.Model):
+    """
+    Per-day count of one event metric (see app.utils.rollups), kept current
+    by the ORM hooks in app.models.events and rebuilt by `flask backfill-rollups`.
+    """
+    __tablename__ = 'daily_rollups'
+
+    metric = db.Column(db.String(64), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    value = db.Column(db.Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f'<DailyRollup {self.metric} {self.day}={self.value}>'
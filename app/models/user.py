@@ -6,6 +6,9 @@ from flask_login import UserMixin
 
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
+    __table_args__ = (
+        db.Index('ix_users_created_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False, index=True)
@@ -23,12 +26,26 @@ class User(UserMixin, db.Model):
     created_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
     last_login = db.Column(db.DateTime, nullable=True)
+
+    # Lowercased copies for indexed admin search (see app.utils.user_search)
+    username_lower = db.Column(db.String(80), nullable=True, index=True)
+    email_lower = db.Column(db.String(120), nullable=True, index=True)
     
     missing_persons = db.relationship('MissingPerson', backref='reporter', lazy='dynamic', 
                                      foreign_keys='MissingPerson.reported_by')
     sighting_reports = db.relationship('SightingReport', foreign_keys='SightingReport.reported_by', backref='reporter', lazy='dynamic')
     verified_reports = db.relationship('SightingReport', foreign_keys='SightingReport.verified_by', backref='verifier', lazy='dynamic')
     notifications = db.relationship('Notification', backref='user', lazy='dynamic')
+
+    # Eager-loadable variants of the dynamic collections above (see app.models.loaders)
+    missing_person_list = db.relationship('MissingPerson', viewonly=True,
+                                          foreign_keys='MissingPerson.reported_by',
+                                          order_by='desc(MissingPerson.created_at)')
+    sighting_report_list = db.relationship('SightingReport', viewonly=True,
+                                           foreign_keys='SightingReport.reported_by',
+                                           order_by='desc(SightingReport.created_at)')
+    notification_list = db.relationship('Notification', viewonly=True,
+                                        order_by='desc(Notification.created_at)')
     
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
@@ -41,3 +58,19 @@ class User(UserMixin, db.Model):
     
     def __repr__(self):
         return f'<User {self.username}>'
+
+
+class UserNameToken(db.Model):
+    """One normalized word of a user's full name, for indexed token lookups"""
+    __tablename__ = 'user_name_tokens'
+    __table_args__ = (
+        db.Index('ix_user_name_tokens_token_user', 'token', 'user_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'),
+                        nullable=False, index=True)
+    token = db.Column(db.String(64), nullable=False)
+
+    def __repr__(self):
+        return f'<UserNameToken {self.token}>'
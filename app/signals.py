@@ -0,0 +1,18 @@
+"""
+Application signals.
+
+case_changed is sent once per committed transaction that inserted, updated
+or deleted MissingPerson rows through the ORM, with the sets of affected ids:
+
+    @case_changed.connect_via(app)
+    def on_case_changed(sender, created, updated, deleted):
+        ...
+
+Receivers run in the committing request, so they should only record the
+change and do any heavy work later. Bulk Core statements do not send it.
+"""
+from blinker import Namespace
+
+signals = Namespace()
+
+case_changed = signals.signal('case-changed')
@@ -0,0 +1,109 @@
+"""
+Buffered activity logging.
+
+Log entries are queued in memory by the request thread and written by a
+background task as one multi-row INSERT on its own connection, every
+ACTIVITY_LOG_FLUSH_INTERVAL seconds, as soon as ACTIVITY_LOG_BATCH_SIZE
+entries are waiting, and at shutdown. Recording never touches the
+caller's session, so it can no longer commit a view's unrelated pending
+changes. When the queue is full new entries are dropped and counted
+rather than making the request wait.
+"""
+import atexit
+import threading
+from collections import deque
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import insert
+from app.extensions import db
+from app.utils.scheduler import PeriodicTask
+
+
+class ActivityLogWriter:
+    def __init__(self, app, interval=5, batch_size=200, max_queued=10000):
+        self.app = app
+        self.batch_size = batch_size
+        self.max_queued = max_queued
+        self.written = 0
+        self.dropped = 0
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._task = PeriodicTask(app, self.flush, interval, name='activity-log-flush')
+
+    def record(self, action, user_id=None, entity_type=None, entity_id=None,
+               description=None, ip_address=None, user_agent=None):
+        entry = {
+            'user_id': user_id,
+            'action': action,
+            'entity_type': entity_type,
+            'entity_id': entity_id,
+            'description': description,
+            'ip_address': ip_address,
+            'user_agent': (user_agent or '')[:255] or None,
+            'created_at': datetime.now(),
+        }
+        with self._lock:
+            if len(self._queue) >= self.max_queued:
+                self.dropped += 1
+                return False
+            self._queue.append(entry)
+            queued = len(self._queue)
+
+        self._task.start()
+        if queued >= self.batch_size:
+            self._task.wake()
+        return True
+
+    def flush(self):
+        """Write every queued entry, batch_size rows per INSERT. Returns rows written"""
+        from app.models.audit import ActivityLog
+        written = 0
+        while True:
+            with self._lock:
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+            if not batch:
+                break
+
+            try:
+                with db.engine.begin() as connection:
+                    connection.execute(insert(ActivityLog.__table__), batch)
+            except Exception:
+                # Requeue ahead of newer entries for the next flush, as far as there is room
+                with self._lock:
+                    room = max(self.max_queued - len(self._queue), 0)
+                    self.dropped += len(batch) - min(room, len(batch))
+                    self._queue.extendleft(reversed(batch[:room]))
+                raise
+            written += len(batch)
+
+        self.written += written
+        return written
+
+    def stats(self):
+        return {'queued': len(self._queue), 'written': self.written, 'dropped': self.dropped}
+
+    def _flush_at_exit(self):
+        self._task.stop()
+        with self.app.app_context():
+            try:
+                self.flush()
+            except Exception as e:
+                self.app.logger.error(f"Could not flush activity logs at shutdown: {e}")
+            if self.dropped:
+                self.app.logger.warning(f"Dropped {self.dropped} activity log entries (queue full)")
+
+
+def init_activity_log(app):
+    writer = ActivityLogWriter(
+        app,
+        interval=app.config.get('ACTIVITY_LOG_FLUSH_INTERVAL', 5),
+        batch_size=app.config.get('ACTIVITY_LOG_BATCH_SIZE', 200),
+        max_queued=app.config.get('ACTIVITY_LOG_MAX_QUEUED', 10000)
+    )
+    atexit.register(writer._flush_at_exit)
+    app.extensions['activity_log'] = writer
+    return writer
+
+
+def get_activity_log():
+    return current_app.extensions['activity_log']
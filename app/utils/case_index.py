@@ -0,0 +1,96 @@
+"""
+In-process indexes over public cases.
+
+LiveCaseIndex loads rows of public cases into an index structure on first
+use and keeps it current from app.signals.case_changed: changed ids are
+queued by the signal and re-read on the next lookup, so commits never pay
+for index maintenance. Writes that bypass the ORM (bulk imports, other
+worker processes) are picked up by a full reload in the background every
+CASE_INDEX_REFRESH_SECONDS.
+
+The wrapped structure only needs add(row), remove(case_id) and __len__,
+plus an optional bulk_load(rows) for full loads; reads go through lookup()
+so they never see a half-applied update.
+"""
+import threading
+from sqlalchemy import select
+from app.extensions import db
+from app.models.missing_person import MissingPerson
+from app.signals import case_changed
+from app.utils.scheduler import PeriodicTask
+
+
+class LiveCaseIndex:
+    def __init__(self, app, factory, columns, name, refresh_interval=900):
+        self.app = app
+        self.factory = factory
+        self.columns = (MissingPerson.id,) + tuple(columns)
+        self.name = name
+        self._index = None
+        self._pending = set()
+        # Ids applied to the old index while a reload reads its snapshot
+        self._applied_during_reload = None
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._task = PeriodicTask(app, self.reload, refresh_interval, name=f'{name}-reload')
+        case_changed.connect(self._on_case_changed, sender=app)
+
+    def _on_case_changed(self, sender, created=(), updated=(), deleted=(), **extra):
+        with self._lock:
+            self._pending.update(created, updated, deleted)
+
+    def _rows(self, ids=None):
+        query = select(*self.columns).where(MissingPerson.is_public == True)
+        if ids is not None:
+            query = query.where(MissingPerson.id.in_(ids))
+        return db.session.execute(query.execution_options(yield_per=5000))
+
+    def reload(self):
+        """Build a fresh index from the database and swap it in"""
+        with self._lock:
+            self._applied_during_reload = set()
+        try:
+            index = self.factory()
+            if hasattr(index, 'bulk_load'):
+                index.bulk_load(self._rows())
+            else:
+                for row in self._rows():
+                    index.add(row)
+        except Exception:
+            with self._lock:
+                self._applied_during_reload = None
+            raise
+        with self._lock:
+            self._index = index
+            # The snapshot may predate changes applied meanwhile: re-read them
+            self._pending |= self._applied_during_reload
+            self._applied_during_reload = None
+        self.app.logger.info(f"Loaded {self.name} with {len(index)} cases")
+        return index
+
+    def _current(self):
+        """The index, loaded and with queued case changes applied"""
+        if self._index is None:
+            with self._load_lock:
+                if self._index is None:
+                    self.reload()
+            self._task.start()
+
+        with self._lock:
+            pending, self._pending = self._pending, set()
+        if pending:
+            rows = self._rows(pending).all()
+            with self._lock:
+                if self._applied_during_reload is not None:
+                    self._applied_during_reload |= pending
+                for case_id in pending:
+                    self._index.remove(case_id)
+                for row in rows:
+                    self._index.add(row)
+        return self._index
+
+    def lookup(self, method, *args, **kwargs):
+        """Call a read method of the index, serialized with its updates"""
+        index = self._current()
+        with self._lock:
+            return getattr(index, method)(*args, **kwargs)
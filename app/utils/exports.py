@@ -0,0 +1,177 @@
+"""
+Streaming CSV / NDJSON exports of cases, sighting reports and activity logs.
+
+Rows are read with yield_per (a server-side cursor on PostgreSQL), encoded
+and yielded in chunks of about CHUNK_SIZE bytes, optionally gzipped on the
+fly, so an export of millions of rows runs in constant memory and the
+first bytes reach the client straight away. The admin export endpoints and
+`flask export` both use stream_export().
+
+Filters: status (cases and reports), a created_at date range, and county,
+matched against the case's last_seen_city (reports use their case's).
+
+Names, descriptions and locations come from the public and the CSV files
+are opened in spreadsheets, so CSV text cells that would be read as a
+formula get a leading apostrophe. NDJSON is written as stored.
+"""
+import csv
+import io
+import json
+import zlib
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from enum import Enum
+from typing import Optional
+from sqlalchemy import select
+from app.extensions import db
+from app.models.missing_person import MissingPerson
+from app.models.sighting import SightingReport
+from app.models.audit import ActivityLog
+from app.models.options import MissingPersonStatus, ReportStatus
+
+YIELD_PER = 1000
+CHUNK_SIZE = 64 * 1024
+FORMATS = ('csv', 'ndjson')
+# First characters that make a spreadsheet evaluate a cell
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+@dataclass(slots=True, frozen=True)
+class ExportSource:
+    model: type
+    columns: tuple
+    statuses: Optional[type] = None
+    # Join the case, for its case_number and the county filter
+    via_case: bool = False
+
+
+SOURCES = {
+    'cases': ExportSource(
+        MissingPerson,
+        ('id', 'case_number', 'full_name', 'age', 'gender', 'is_minor', 'status', 'is_verified',
+         'is_public', 'last_seen_location', 'last_seen_city', 'last_seen_date', 'latitude', 'longitude',
+         'height', 'weight', 'distinguishing_features', 'last_seen_wearing', 'contact_name',
+         'contact_phone', 'police_report_number', 'reported_by', 'verified_sighting_count',
+         'created_at', 'found_date', 'closed_at'),
+        statuses=MissingPersonStatus
+    ),
+    'reports': ExportSource(
+        SightingReport,
+        ('id', 'missing_person_id', 'sighting_date', 'sighting_location', 'latitude', 'longitude',
+         'description', 'person_condition', 'accompanied_by', 'is_anonymous', 'reporter_contact',
+         'reported_by', 'status', 'verified_by', 'verified_at', 'verification_notes', 'priority_score',
+         'created_at'),
+        statuses=ReportStatus,
+        via_case=True
+    ),
+    'activity-logs': ExportSource(
+        ActivityLog,
+        ('id', 'created_at', 'user_id', 'action', 'entity_type', 'entity_id', 'description',
+         'ip_address', 'user_agent')
+    ),
+}
+
+
+def export_query(kind, status=None, since=None, until=None, county=None):
+    """
+    SELECT of an export's columns in id order, with the filters applied.
+    since/until are dates, both inclusive. Raises ValueError for an
+    unknown export, or a filter it does not support.
+    """
+    source = SOURCES.get(kind)
+    if source is None:
+        raise ValueError(f'Unknown export {kind!r}; choose from {", ".join(SOURCES)}')
+
+    table = source.model.__table__
+    columns = [table.c[name] for name in source.columns]
+    if source.via_case:
+        columns.insert(2, MissingPerson.__table__.c.case_number)
+    query = select(*columns).order_by(table.c.id)
+    if source.via_case:
+        query = query.join(MissingPerson.__table__, MissingPerson.__table__.c.id == table.c.missing_person_id)
+
+    if status:
+        if source.statuses is None:
+            raise ValueError(f'{kind} cannot be filtered by status')
+        try:
+            query = query.where(table.c.status == source.statuses[status.upper()])
+        except KeyError:
+            raise ValueError(f'Invalid status {status!r}') from None
+    if since:
+        query = query.where(table.c.created_at >= datetime.combine(since, datetime.min.time()))
+    if until:
+        query = query.where(table.c.created_at < datetime.combine(until + timedelta(days=1), datetime.min.time()))
+    if county:
+        if source.model is not MissingPerson and not source.via_case:
+            raise ValueError(f'{kind} cannot be filtered by county')
+        query = query.where(MissingPerson.__table__.c.last_seen_city == county)
+    return query
+
+
+def _value(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _csv_cell(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _encode_rows(rows, columns, fmt):
+    """Encoded text of the rows, in chunks of about CHUNK_SIZE"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == 'csv' else None
+    if writer is not None:
+        writer.writerow(columns)
+
+    for row in rows:
+        values = [_value(value) for value in row]
+        if writer is not None:
+            writer.writerow([_csv_cell(value) for value in values])
+        else:
+            buffer.write(json.dumps(dict(zip(columns, values)), ensure_ascii=False))
+            buffer.write('\n')
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def stream_export(kind, fmt='csv', compress=False, **filters):
+    """
+    Generator of the bytes of an export (see export_query for filters).
+    The query is built, and bad filters raise, before the first chunk.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f'Unknown format {fmt!r}; choose from {", ".join(FORMATS)}')
+    query = export_query(kind, **filters)
+    return _stream(query, fmt, compress)
+
+
+def _stream(query, fmt, compress):
+    result = db.session.execute(query.execution_options(yield_per=YIELD_PER))
+    columns = list(result.keys())
+    # wbits=31: a gzip stream rather than raw zlib
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    try:
+        for text in _encode_rows(result, columns, fmt):
+            data = text.encode('utf-8')
+            if compressor is not None:
+                data = compressor.compress(data)
+            if data:
+                yield data
+        if compressor is not None:
+            yield compressor.flush()
+    finally:
+        result.close()
+
+
+def export_filename(kind, fmt, compress):
+    return f'{kind}-{date.today():%Y%m%d}.{fmt}' + ('.gz' if compress else '')
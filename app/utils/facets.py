@@ -0,0 +1,92 @@
+"""
+Facet counts for case search.
+
+For a search query, counts of public matching cases by status, gender, age
+band, minor flag and city come from a single GROUP BY over all five
+dimensions, rolled up per dimension in Python. Counts ignore the facet
+filters themselves (each dropdown shows how many cases every choice would
+give for the query), so they are cached per normalized query alone.
+"""
+from collections import Counter
+from flask import current_app
+from sqlalchemy import case, func, select
+from app.extensions import db
+from app.models.missing_person import MissingPerson
+from app.utils.result_cache import ResultCache, normalize_query
+from app.utils.search import apply_search
+
+AGE_BANDS = [
+    ('0-12', 0, 12),
+    ('13-17', 13, 17),
+    ('18-25', 18, 25),
+    ('26-40', 26, 40),
+    ('41-60', 41, 60),
+    ('61+', 61, None),
+]
+UNKNOWN = 'unknown'
+MAX_CITIES = 20
+
+
+def age_band_expression():
+    return case(
+        *[((MissingPerson.age >= low) & (MissingPerson.age <= high) if high is not None
+           else MissingPerson.age >= low, label)
+          for label, low, high in AGE_BANDS],
+        else_=UNKNOWN
+    )
+
+
+def filter_age_band(query, band):
+    """Restrict a MissingPerson query to an AGE_BANDS label; unknown labels are ignored"""
+    for label, low, high in AGE_BANDS:
+        if label == band:
+            query = query.filter(MissingPerson.age >= low)
+            if high is not None:
+                query = query.filter(MissingPerson.age <= high)
+    return query
+
+
+def compute_facets(raw_query):
+    query = apply_search(MissingPerson.query.filter(MissingPerson.is_public == True), raw_query, ranked=False)
+    matches = query.with_entities(
+        MissingPerson.status, MissingPerson.gender, age_band_expression().label('age_band'),
+        MissingPerson.is_minor, MissingPerson.last_seen_city
+    ).order_by(None).subquery()
+    dimensions = (matches.c.status, matches.c.gender, matches.c.age_band,
+                  matches.c.is_minor, matches.c.last_seen_city)
+    rows = db.session.execute(
+        select(*dimensions, func.count()).group_by(*dimensions)
+    ).all()
+
+    status, gender, bands, minor, city = Counter(), Counter(), Counter(), Counter(), Counter()
+    total = 0
+    for status_value, gender_value, band, is_minor, city_value, count in rows:
+        total += count
+        status[status_value.value] += count
+        gender[gender_value or UNKNOWN] += count
+        bands[band] += count
+        minor['minor' if is_minor else 'adult'] += count
+        city[city_value or UNKNOWN] += count
+
+    return {
+        'total': total,
+        'status': dict(status),
+        'gender': dict(gender),
+        'age_band': {label: bands[label] for label, _, _ in AGE_BANDS + [(UNKNOWN, 0, 0)] if bands[label]},
+        'minor': dict(minor),
+        'city': dict(city.most_common(MAX_CITIES)),
+    }
+
+
+def init_facets(app):
+    app.extensions['facet_cache'] = ResultCache(
+        app, 'facets',
+        max_entries=app.config.get('FACET_CACHE_SIZE', 1000),
+        ttl=app.config.get('FACET_CACHE_SECONDS', 60)
+    )
+
+
+def search_facets(raw_query):
+    """Facet counts for raw_query, cached per normalized query"""
+    key = normalize_query(raw_query)
+    return current_app.extensions['facet_cache'].get_or_compute(key, lambda: compute_facets(key))
@@ -0,0 +1,203 @@
+"""
+Typo-tolerant case search by trigram similarity.
+
+Names are matched word by word: a query word matches a case when the
+trigrams of the word and of one of the case's name or location words are
+similar enough (Jaccard, as in pg_trgm), so "Wanjiru" finds "Wanjiku
+Kamau" and "Otiyeno" finds "Otieno". A case scores the mean of its best
+match per query word, counting unmatched words as zero.
+
+On PostgreSQL with the pg_trgm extension the database does the work
+through GIN trigram indexes; elsewhere an in-process inverted trigram index
+(see app.utils.case_index) answers the query.
+"""
+import heapq
+import math
+import re
+from collections import Counter
+from flask import current_app
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from app.extensions import db
+from app.models.missing_person import MissingPerson
+from app.utils.case_index import LiveCaseIndex
+
+MAX_QUERY_WORDS = 6
+# Columns given a pg_trgm index on PostgreSQL
+TRGM_COLUMNS = ('full_name', 'last_seen_location')
+
+
+def words(value):
+    return re.findall(r'\w+', (value or '').lower())
+
+
+def trigrams(word):
+    """pg_trgm style trigrams of a single lowercase word"""
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a, b):
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared) if shared else 0.0
+
+
+class TrigramIndex:
+    """
+    Trigram index over the distinct name and location words of cases.
+
+    Fuzzy matching runs against the vocabulary, which is far smaller than
+    the number of cases (common names and towns repeat), and matched words
+    are then mapped to their cases.
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.word_trigrams = {}
+        self.word_cases = {}
+        self.case_words = {}
+
+    def __len__(self):
+        return len(self.case_words)
+
+    def add(self, row):
+        case_id, full_name, location = row
+        self.remove(case_id)
+        case_words = tuple(set(words(full_name)) | set(words(location)))
+        self.case_words[case_id] = case_words
+        for word in case_words:
+            cases = self.word_cases.get(word)
+            if cases is None:
+                cases = self.word_cases[word] = set()
+                self.word_trigrams[word] = frozenset(trigrams(word))
+                for trigram in self.word_trigrams[word]:
+                    self.postings.setdefault(trigram, set()).add(word)
+            cases.add(case_id)
+
+    def remove(self, case_id):
+        for word in self.case_words.pop(case_id, ()):
+            cases = self.word_cases[word]
+            cases.discard(case_id)
+            if cases:
+                continue
+            del self.word_cases[word]
+            for trigram in self.word_trigrams.pop(word):
+                posting = self.postings[trigram]
+                posting.discard(word)
+                if not posting:
+                    del self.postings[trigram]
+
+    def similar_words(self, word, threshold):
+        """{vocabulary word: similarity} for words at least threshold similar"""
+        query_trigrams = trigrams(word)
+        # Counting shared trigrams over the posting lists runs in C; only words
+        # sharing enough of them to possibly reach threshold are scored exactly
+        needed = max(1, math.ceil(threshold * len(query_trigrams)))
+        counts = Counter()
+        for trigram in query_trigrams:
+            counts.update(self.postings.get(trigram, ()))
+        candidates = [candidate for candidate, count in counts.items() if count >= needed]
+
+        matches = {}
+        for candidate in candidates:
+            score = similarity(query_trigrams, self.word_trigrams[candidate])
+            if score >= threshold:
+                matches[candidate] = score
+        return matches
+
+    def search(self, query, limit=20, threshold=0.3):
+        """Return [(case_id, score)] best first"""
+        query_words = words(query)[:MAX_QUERY_WORDS]
+        if not query_words:
+            return []
+
+        scores = Counter()
+        for word in query_words:
+            best = {}
+            matches = self.similar_words(word, threshold)
+            for match, score in sorted(matches.items(), key=lambda item: -item[1]):
+                for case_id in self.word_cases[match]:
+                    best.setdefault(case_id, score)
+            scores.update(best)
+
+        minimum = threshold * len(query_words)
+        ranked = heapq.nsmallest(
+            limit,
+            ((-total, case_id) for case_id, total in scores.items() if total >= minimum)
+        )
+        return [(case_id, -total / len(query_words)) for total, case_id in ranked]
+
+
+class InProcessFuzzySearch:
+    name = 'memory'
+
+    def __init__(self, app):
+        self.index = LiveCaseIndex(
+            app, TrigramIndex,
+            (MissingPerson.full_name, MissingPerson.last_seen_location),
+            name='trigram-index',
+            refresh_interval=app.config.get('CASE_INDEX_REFRESH_SECONDS', 900)
+        )
+
+    def search(self, query, limit, threshold):
+        return self.index.lookup('search', query, limit, threshold)
+
+
+def trgm_index_name(column):
+    return f'ix_missing_persons_{column}_trgm'
+
+
+class PgTrgmFuzzySearch:
+    name = 'pg_trgm'
+
+    @staticmethod
+    def install(engine):
+        """Enable pg_trgm and its indexes. Returns False when not permitted"""
+        try:
+            with engine.begin() as connection:
+                connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                for column in TRGM_COLUMNS:
+                    connection.execute(text(
+                        f"CREATE INDEX IF NOT EXISTS {trgm_index_name(column)} "
+                        f"ON missing_persons USING gin (lower({column}) gin_trgm_ops)"
+                    ))
+        except DBAPIError:
+            return False
+        return True
+
+    def search(self, query, limit, threshold):
+        query = ' '.join(words(query)[:MAX_QUERY_WORDS])
+        if not query:
+            return []
+        db.session.execute(text("SELECT set_config('pg_trgm.word_similarity_threshold', :threshold, true)"),
+                           {'threshold': str(threshold)})
+        # <% is word similarity, so a misspelt first name still matches a full name
+        rows = db.session.execute(text(
+            "SELECT id, greatest(word_similarity(:q, lower(full_name)), "
+            "word_similarity(:q, lower(last_seen_location))) AS score "
+            "FROM missing_persons "
+            "WHERE is_public AND (:q <% lower(full_name) OR :q <% lower(last_seen_location)) "
+            "ORDER BY score DESC, id LIMIT :limit"
+        ), {'q': query, 'limit': limit})
+        return [(case_id, score) for case_id, score in rows]
+
+
+def init_fuzzy_search(app):
+    backend = app.config.get('FUZZY_SEARCH_BACKEND', 'auto')
+    search = None
+
+    if backend in ('auto', 'pg_trgm'):
+        with app.app_context():
+            if db.engine.dialect.name == 'postgresql' and PgTrgmFuzzySearch.install(db.engine):
+                search = PgTrgmFuzzySearch()
+            elif backend == 'pg_trgm':
+                app.logger.warning("pg_trgm unavailable, using the in-process trigram index")
+
+    app.extensions['fuzzy_search'] = search or InProcessFuzzySearch(app)
+    return app.extensions['fuzzy_search']
+
+
+def fuzzy_case_ids(query, limit=20):
+    """Ids of public cases similar to query, best match first"""
+    threshold = current_app.config.get('FUZZY_SEARCH_THRESHOLD', 0.3)
+    return [case_id for case_id, _ in current_app.extensions['fuzzy_search'].search(query, limit, threshold)]
@@ -0,0 +1,145 @@
+"""
+Keyset (cursor) pagination.
+
+Lists are ordered on (sort column, id) and a page is read with a range
+condition on those two columns starting from the first or last row of the
+page the reader came from, so every page costs the same index range scan
+however deep it is. The cursors handed out are opaque tokens of that row's
+(sort value, id); links carry them as ?after= (next page) or ?before=
+(previous page).
+
+Totals are not counted per page: callers ask for an exact count
+explicitly, and unfiltered lists on PostgreSQL get the planner's estimate.
+"""
+import base64
+from datetime import datetime
+from sqlalchemy import and_, or_, text
+
+
+def encode_cursor(value, ident):
+    raw = f'{value.isoformat() if isinstance(value, datetime) else repr(float(value))}|{ident}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """(sort value, id) from a cursor token, or None if it is not one of ours"""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        value, ident = raw.rsplit('|', 1)
+        return _decode_value(value), int(ident)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def _decode_value(value):
+    """Sort values are datetimes or numbers (scores)"""
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return float(value)
+
+
+class KeysetPage:
+    """One page of a keyset-paginated list"""
+
+    def __init__(self, items, keys, per_page, has_next, has_prev, total=None, total_is_estimate=False):
+        self.items = items
+        self.per_page = per_page
+        self.has_next = has_next
+        self.has_prev = has_prev
+        self.next_cursor = encode_cursor(*keys[-1]) if keys and has_next else None
+        self.prev_cursor = encode_cursor(*keys[0]) if keys and has_prev else None
+        self.total = total
+        self.total_is_estimate = total_is_estimate
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def cursors(self):
+        return {
+            'next_cursor': self.next_cursor,
+            'prev_cursor': self.prev_cursor,
+            'per_page': self.per_page,
+            'total': self.total,
+            'total_is_estimate': self.total_is_estimate
+        }
+
+
+def _window(query, sort_column, id_column, after, before, per_page, descending):
+    """
+    query limited to the rows after/before the given cursor, plus one to
+    tell whether there is more. Returns (query, backwards); a backwards
+    window is read in reverse order and must be flipped for display.
+    """
+    position = decode_cursor(before) or decode_cursor(after)
+    backwards = position is not None and decode_cursor(before) is not None
+    # Rows come in descending order when reading forwards on a descending
+    # list or backwards on an ascending one
+    reverse = descending != backwards
+
+    if position is not None:
+        value, ident = position
+        if reverse:
+            # (sort, id) < (value, ident); the leading <= keeps it an index range
+            query = query.filter(sort_column <= value,
+                                 or_(sort_column < value, and_(sort_column == value, id_column < ident)))
+        else:
+            query = query.filter(sort_column >= value,
+                                 or_(sort_column > value, and_(sort_column == value, id_column > ident)))
+
+    order = (sort_column.desc(), id_column.desc()) if reverse else (sort_column.asc(), id_column.asc())
+    return query.order_by(None).order_by(*order).limit(per_page + 1), backwards
+
+
+def _page_bounds(rows, per_page, after, backwards):
+    """Trim the extra row and work out has_next/has_prev for a window's rows"""
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        return rows[::-1], True, more
+    return rows, more, decode_cursor(after) is not None
+
+
+def keyset_keys(query, sort_column, id_column, after=None, before=None, per_page=20, descending=True):
+    """
+    The (sort value, id) keys of one page, with has_next and has_prev.
+    Plain data, so it can be cached and hydrated separately.
+    """
+    window, backwards = _window(query.with_entities(sort_column, id_column), sort_column, id_column,
+                                after, before, per_page, descending)
+    keys, has_next, has_prev = _page_bounds([tuple(row) for row in window], per_page, after, backwards)
+    return keys, has_next, has_prev
+
+
+def paginate_keyset(query, sort_column, id_column, after=None, before=None, per_page=20,
+                    descending=True, count=False):
+    """
+    Keyset-paginate an entity query (any order_by on it is replaced).
+    With count=True the exact total is counted; otherwise it is an estimate
+    when one is cheap to get, or None.
+    """
+    window, backwards = _window(query, sort_column, id_column, after, before, per_page, descending)
+    items, has_next, has_prev = _page_bounds(window.all(), per_page, after, backwards)
+    keys = [(getattr(item, sort_column.key), getattr(item, id_column.key)) for item in items]
+
+    total, estimate = None, False
+    if count:
+        total = query.order_by(None).count()
+    elif query.whereclause is None:
+        total = estimated_count(query)
+        estimate = total is not None
+    return KeysetPage(items, keys, per_page, has_next, has_prev, total, estimate)
+
+
+def estimated_count(query):
+    """The planner's row estimate for an unfiltered query's table (PostgreSQL only)"""
+    session = query.session
+    if session.get_bind().dialect.name != 'postgresql':
+        return None
+    table = query.column_descriptions[0]['entity'].__table__
+    estimate = session.execute(
+        text('SELECT reltuples::bigint FROM pg_class WHERE relname = :table'), {'table': table.name}
+    ).scalar()
+    return max(estimate, 0) if estimate is not None else None
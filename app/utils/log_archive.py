@@ -0,0 +1,130 @@
+"""
+Activity log retention and archives.
+
+Rows older than the retention period are moved out of activity_logs into
+one gzipped NDJSON file per month (activity-logs-YYYY-MM.ndjson.gz under
+ACTIVITY_LOG_ARCHIVE_DIR), oldest first and batch_size rows per
+transaction, so the table stays small and no lock is held for long. Each
+batch is appended to its month files as a new gzip member and fsynced
+before its rows are deleted; a crash in between can at worst leave an
+entry both in the table and in the archive.
+
+search_archives() streams entries back out of the month files in a date
+range, filtering as it reads.
+
+The month files stand in for table partitioning. SQLite has none, and
+PostgreSQL range partitions would need created_at in activity_logs'
+primary key.
+"""
+import glob
+import gzip
+import json
+import os
+import re
+from collections import defaultdict
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, delete
+from app.extensions import db
+from app.models.audit import ActivityLog
+
+ARCHIVE_NAME = re.compile(r'activity-logs-(\d{4})-(\d{2})\.ndjson\.gz$')
+
+
+def archive_dir():
+    path = current_app.config.get('ACTIVITY_LOG_ARCHIVE_DIR') or os.path.join(
+        current_app.instance_path, 'activity-log-archive')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def archive_path(month):
+    """Archive file of a (year, month)"""
+    return os.path.join(archive_dir(), f'activity-logs-{month[0]:04d}-{month[1]:02d}.ndjson.gz')
+
+
+def _entry(row):
+    entry = dict(row._mapping)
+    entry['created_at'] = entry['created_at'].isoformat()
+    return entry
+
+
+def _append(month, entries):
+    with open(archive_path(month), 'ab') as archive:
+        with gzip.GzipFile(fileobj=archive, mode='wb', mtime=0) as member:
+            for entry in entries:
+                member.write(json.dumps(entry, separators=(',', ':')).encode() + b'\n')
+        archive.flush()
+        os.fsync(archive.fileno())
+
+
+def archive_activity_logs(older_than_days, batch_size=5000):
+    """
+    Move activity logs created more than older_than_days ago into the
+    monthly archives. Returns {(year, month): rows archived}.
+    """
+    cutoff = datetime.now() - timedelta(days=older_than_days)
+    table = ActivityLog.__table__
+    archived = defaultdict(int)
+
+    while True:
+        rows = db.session.execute(
+            select(table).where(table.c.created_at < cutoff)
+            .order_by(table.c.created_at, table.c.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        months = defaultdict(list)
+        for row in rows:
+            months[row.created_at.year, row.created_at.month].append(_entry(row))
+        for month, entries in months.items():
+            _append(month, entries)
+            archived[month] += len(entries)
+
+        db.session.execute(delete(table).where(table.c.id.in_([row.id for row in rows])))
+        db.session.commit()
+
+    return dict(archived)
+
+
+def archive_months(start=None, end=None):
+    """(year, month) of every archive file, oldest first, optionally limited to a range"""
+    months = []
+    for path in glob.glob(os.path.join(archive_dir(), 'activity-logs-*.ndjson.gz')):
+        match = ARCHIVE_NAME.search(path)
+        if match:
+            months.append((int(match.group(1)), int(match.group(2))))
+    return sorted(month for month in months
+                  if (start is None or month >= (start.year, start.month))
+                  and (end is None or month <= (end.year, end.month)))
+
+
+def search_archives(start=None, end=None, action=None, user_id=None, entity_type=None,
+                    entity_id=None, contains=None):
+    """
+    Yield archived entries (dicts) created in [start, end], oldest month
+    first, matching every filter given. action and contains match
+    case-insensitively as substrings; contains looks at the description.
+    """
+    action = action.lower() if action else None
+    contains = contains.lower() if contains else None
+
+    for month in archive_months(start, end):
+        with gzip.open(archive_path(month), 'rt', encoding='utf-8') as archive:
+            for line in archive:
+                entry = json.loads(line)
+                created_at = datetime.fromisoformat(entry['created_at'])
+                if start is not None and created_at < start or end is not None and created_at > end:
+                    continue
+                if action and action not in (entry['action'] or '').lower():
+                    continue
+                if user_id is not None and entry['user_id'] != user_id:
+                    continue
+                if entity_type and entry['entity_type'] != entity_type:
+                    continue
+                if entity_id is not None and entry['entity_id'] != entity_id:
+                    continue
+                if contains and contains not in (entry['description'] or '').lower():
+                    continue
+                yield entry
@@ -0,0 +1,60 @@
+"""
+Parsing of the free-text height and weight fields.
+
+Reports write these however the reporter thinks of them: "170 cm", "1.7m",
+"5'7\"", "5 ft 7 in", "60 kg", "132 lbs" or a bare number. They are parsed
+into centimetres and kilograms for the numeric height_cm/weight_kg columns;
+anything unparseable or implausible gives None.
+"""
+import re
+
+NUMBER = r'(\d+(?:[.,]\d+)?)'
+
+HEIGHT_RANGE_CM = (30, 250)
+WEIGHT_RANGE_KG = (2, 300)
+
+
+def _number(value):
+    return float(value.replace(',', '.'))
+
+
+def _plausible(value, bounds):
+    low, high = bounds
+    return round(value, 1) if value is not None and low <= value <= high else None
+
+
+def parse_height_cm(text):
+    """Height in centimetres from free text, or None"""
+    text = (text or '').strip().lower()
+    if not text:
+        return None
+
+    feet = re.search(rf'{NUMBER}\s*(?:\'|’|ft|feet|foot)\s*(?:{NUMBER}\s*(?:"|”|\'\'|in|inch|inches)?)?', text)
+    if feet:
+        inches = _number(feet.group(2)) if feet.group(2) else 0
+        return _plausible(_number(feet.group(1)) * 30.48 + inches * 2.54, HEIGHT_RANGE_CM)
+
+    match = re.search(rf'{NUMBER}\s*(cm|centimet\w*|m\b|met\w*|in\b|inch\w*)?', text)
+    if not match:
+        return None
+    value, unit = _number(match.group(1)), match.group(2) or ''
+    if unit.startswith('m'):
+        value *= 100
+    elif unit.startswith('in'):
+        value *= 2.54
+    elif not unit and value < 3:
+        # A bare 1.65 is metres
+        value *= 100
+    return _plausible(value, HEIGHT_RANGE_CM)
+
+
+def parse_weight_kg(text):
+    """Weight in kilograms from free text, or None"""
+    text = (text or '').strip().lower()
+    match = re.search(rf'{NUMBER}\s*(kg|kilo\w*|lb|lbs|pound\w*)?', text)
+    if not match:
+        return None
+    value, unit = _number(match.group(1)), match.group(2) or ''
+    if unit.startswith(('lb', 'pound')):
+        value *= 0.45359237
+    return _plausible(value, WEIGHT_RANGE_KG)
@@ -0,0 +1,103 @@
+"""
+Rendered page cache for anonymous visitors.
+
+Views decorated with @cached_page store their rendered HTML per route and
+normalized query string, and later logged-out requests for the same key are
+answered without running the view. Only anonymous GETs with no pending
+flash messages are served or stored, and only 200 responses are stored.
+
+The CSRF token in the page is swapped for a placeholder when it is stored
+and for the visitor's own token when it is served. The cache is a
+ResultCache: LRU with a TTL, per process. Case pages are dropped when their
+case changes (edits, status, photos, sightings) and list pages on any case
+change; figures that do not come from cases (users, pending reports) may be
+up to PAGE_CACHE_SECONDS old.
+"""
+from dataclasses import dataclass
+from functools import wraps
+from flask import current_app, request, session, make_response
+from flask_login import current_user
+from flask_wtf.csrf import generate_csrf
+from app.utils.result_cache import ResultCache, normalize_query
+
+CSRF_PLACEHOLDER = b'__page_cache_csrf_token__'
+LISTS = 'lists'
+
+
+@dataclass(slots=True, frozen=True)
+class CachedPage:
+    body: bytes
+    mimetype: str
+
+
+class PageCache(ResultCache):
+    def _on_case_changed(self, sender, created=(), updated=(), deleted=()):
+        stale = {('case', case_id) for case_id in set(updated) | set(deleted)}
+        stale.add(LISTS)
+        with self._lock:
+            for key in [key for key in self._entries if key[0] in stale]:
+                del self._entries[key]
+            self._generation += 1
+
+
+def init_page_cache(app):
+    app.extensions['page_cache'] = PageCache(
+        app, 'pages',
+        max_entries=app.config.get('PAGE_CACHE_SIZE', 500),
+        ttl=app.config.get('PAGE_CACHE_SECONDS', 60)
+    )
+
+
+def get_page_cache():
+    return current_app.extensions['page_cache']
+
+
+def _cacheable_request():
+    return (request.method == 'GET' and not current_user.is_authenticated
+            and '_flashes' not in session)
+
+
+def _normalized_args():
+    return tuple(sorted(
+        (name, normalize_query(value) if name == 'q' else value.strip())
+        for name, value in request.args.items(multi=True) if value.strip()
+    ))
+
+
+def cached_page(case_arg=None, on_hit=None):
+    """
+    Cache a view's page for anonymous visitors.
+
+    case_arg names the view argument holding a case id, so the page is
+    dropped when that case changes; other pages are dropped on any case
+    change. on_hit(**view_args) runs when a request is served from the
+    cache, for side effects the view would have had (such as counting a view).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**view_args):
+            if not _cacheable_request():
+                return view(**view_args)
+
+            cache = get_page_cache()
+            tag = ('case', view_args[case_arg]) if case_arg else LISTS
+            key = (tag, request.path, _normalized_args())
+
+            page = cache.get(key)
+            if page is not None:
+                if on_hit is not None:
+                    on_hit(**view_args)
+                response = make_response(page.body.replace(CSRF_PLACEHOLDER, generate_csrf().encode()))
+                response.mimetype = page.mimetype
+                response.headers['X-Page-Cache'] = 'HIT'
+                return response
+
+            generation = cache.generation
+            response = make_response(view(**view_args))
+            if response.status_code == 200 and not response.direct_passthrough and _cacheable_request():
+                body = response.get_data().replace(generate_csrf().encode(), CSRF_PLACEHOLDER)
+                cache.set(key, CachedPage(body, response.mimetype), generation)
+            response.headers['X-Page-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
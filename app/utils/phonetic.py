@@ -0,0 +1,61 @@
+"""
+Phonetic keys for names.
+
+Names reach us transcribed by ear from phone calls and police OB entries,
+so the key folds the spelling differences common in Kenyan names:
+
+- l/r (Wanjilu, Wanjiru), b/v, c/k/q, ph/f, z/s, sh/s
+- silent h after d/t and a y glide between vowels (Odhiambo/Odiambo,
+  Otiyeno/Otieno, Cheruiyot/Cheruyot)
+- doubled letters and vowels after the first letter
+
+The key is the first sound followed by the consonant skeleton, in the
+spirit of Metaphone. A name's key is the sorted set of its word keys, so
+"Kamau Wanjiku" and "Wanjiku Kamau" share it.
+"""
+import re
+import unicodedata
+
+MAX_KEY_LENGTH = 8
+
+RULES = [
+    (r'[^a-z]', ''),
+    (r'ch', '1'),
+    (r'sh', 's'),
+    (r'ph', 'f'),
+    (r'(?<=[dt])h', ''),
+    (r'(?<=.)h', ''),
+    (r'ck|q', 'k'),
+    (r'c(?=[eiy])', 's'),
+    (r'c', 'k'),
+    (r'1', 'c'),
+    (r'x', 'ks'),
+    (r'z', 's'),
+    (r'l', 'r'),
+    (r'v', 'b'),
+    (r'(?<=[aeiou])y(?=[aeiou])', ''),
+    (r'(.)\1+', r'\1'),
+]
+RULES = [(re.compile(pattern), replacement) for pattern, replacement in RULES]
+
+
+def phonetic_key(word):
+    """Phonetic key of a single word, '' when it has no letters"""
+    word = unicodedata.normalize('NFKD', word or '').encode('ascii', 'ignore').decode().lower()
+    for pattern, replacement in RULES:
+        word = pattern.sub(replacement, word)
+    if not word:
+        return ''
+
+    first = 'a' if word[0] in 'aeiouy' else word[0]
+    return (first + re.sub(r'[aeiouy]', '', word[1:]))[:MAX_KEY_LENGTH]
+
+
+def name_keys(name):
+    """Distinct phonetic keys of the words of a name, sorted"""
+    return sorted({key for key in map(phonetic_key, re.findall(r'\w+', name or '')) if key})
+
+
+def name_phonetic(name):
+    """Order-insensitive phonetic key of a whole name"""
+    return ' '.join(name_keys(name)) or None
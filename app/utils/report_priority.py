@@ -0,0 +1,148 @@
+"""
+Moderation queue priority of sighting reports.
+
+Each report carries a priority_score (0-100) that is computed as it is
+written (see app.models.events), so the queue page is one range scan of
+the (status, priority_score, id) index. The score is the sum of:
+
+    minor          25   the case is a minor
+    freshness      30   halving every FRESHNESS_HALF_LIFE_HOURS since the
+                        case was last seen
+    proximity      25   halving every PROXIMITY_HALF_DISTANCE_KM between the
+                        sighting and the last-seen coordinates
+    photo          10   the report has a photo attached
+    verified       10   the reporter's account is verified
+
+Freshness decays with time alone, so pending reports are rescored by a
+background task every REPORT_PRIORITY_RESCORE_SECONDS, and by
+`flask rescore-reports`.
+"""
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import select, update, bindparam, exists, or_
+from sqlalchemy.orm.attributes import set_committed_value
+from app.extensions import db
+from app.models.missing_person import MissingPerson
+from app.models.sighting import SightingReport, SightingPhoto
+from app.models.user import User
+from app.models.options import ReportStatus
+from app.models.loaders import view_options
+from app.utils.scheduler import PeriodicTask
+from app.utils.keyset import paginate_keyset
+
+MINOR_WEIGHT = 25
+FRESHNESS_WEIGHT = 30
+PROXIMITY_WEIGHT = 25
+PHOTO_WEIGHT = 10
+VERIFIED_REPORTER_WEIGHT = 10
+
+FRESHNESS_HALF_LIFE_HOURS = 48
+PROXIMITY_HALF_DISTANCE_KM = 10
+
+
+def priority_score(is_minor, last_seen_date, distance_km, has_photo, reporter_verified, now=None):
+    """Score of a report from its factors; distance_km is None when either point is unknown"""
+    score = 0.0
+    if is_minor:
+        score += MINOR_WEIGHT
+    if last_seen_date is not None:
+        hours = max(((now or datetime.now()) - last_seen_date).total_seconds() / 3600, 0)
+        score += FRESHNESS_WEIGHT * 0.5 ** (hours / FRESHNESS_HALF_LIFE_HOURS)
+    if distance_km is not None:
+        score += PROXIMITY_WEIGHT * 0.5 ** (distance_km / PROXIMITY_HALF_DISTANCE_KM)
+    if has_photo:
+        score += PHOTO_WEIGHT
+    if reporter_verified:
+        score += VERIFIED_REPORTER_WEIGHT
+    return round(score, 3)
+
+
+def score_reports(connection, report_ids=(), person_ids=(), reporter_ids=(), session=None, now=None):
+    """
+    Recompute priority_score of the given reports, and of the pending
+    reports on the given cases or by the given reporters. With no ids at
+    all, every pending report is rescored. Returns the number of reports.
+
+    When a session is given, reports it has loaded are synced in place.
+    """
+    from app.api.routes.map import calculate_distance
+
+    report, person, user = SightingReport.__table__.c, MissingPerson.__table__.c, User.__table__.c
+    pending = report.status == ReportStatus.PENDING
+    if report_ids or person_ids or reporter_ids:
+        condition = or_(
+            report.id.in_(report_ids),
+            pending & report.missing_person_id.in_(person_ids),
+            pending & report.reported_by.in_(reporter_ids)
+        )
+    else:
+        condition = pending
+
+    has_photo = exists().where(SightingPhoto.__table__.c.sighting_id == report.id)
+    rows = connection.execute(
+        select(report.id, report.latitude, report.longitude, person.is_minor, person.last_seen_date,
+               person.latitude.label('person_latitude'), person.longitude.label('person_longitude'),
+               user.is_verified, has_photo.label('has_photo'))
+        .join(MissingPerson.__table__, person.id == report.missing_person_id)
+        .outerjoin(User.__table__, user.id == report.reported_by)
+        .where(condition)
+    ).all()
+    if not rows:
+        return 0
+
+    now = now or datetime.now()
+    scores = {}
+    for row in rows:
+        distance = None
+        if None not in (row.latitude, row.longitude, row.person_latitude, row.person_longitude):
+            distance = calculate_distance(row.latitude, row.longitude, row.person_latitude, row.person_longitude)
+        scores[row.id] = priority_score(row.is_minor, row.last_seen_date, distance,
+                                        row.has_photo, row.is_verified, now)
+
+    table = SightingReport.__table__
+    connection.execute(
+        update(table)
+        .where(table.c.id == bindparam('b_id'))
+        # A rescore is not an edit of the report
+        .values(updated_at=table.c.updated_at, priority_score=bindparam('b_score')),
+        [{'b_id': report_id, 'b_score': score} for report_id, score in scores.items()]
+    )
+
+    if session is not None:
+        for report_id, score in scores.items():
+            obj = session.identity_map.get(session.identity_key(SightingReport, report_id))
+            if obj is not None:
+                set_committed_value(obj, 'priority_score', score)
+    return len(scores)
+
+
+def rescore_pending_reports():
+    """Rescore every pending report as time has moved on. Returns the number rescored"""
+    rescored = score_reports(db.session.connection(), session=db.session)
+    db.session.commit()
+    return rescored
+
+
+class ReportPriority:
+    def __init__(self, app, interval=900):
+        self.app = app
+        self._task = PeriodicTask(app, rescore_pending_reports, interval, name='report-rescore')
+
+    def queue(self, after=None, before=None, per_page=20, count=False):
+        """One page of pending reports, highest priority first"""
+        # Scores may be a restart's worth stale: rescore as soon as the task starts
+        self._task.start(run_now=True)
+        query = (SightingReport.query.options(*view_options('admin_reports'))
+                 .filter(SightingReport.status == ReportStatus.PENDING))
+        return paginate_keyset(query, SightingReport.priority_score, SightingReport.id,
+                               after=after, before=before, per_page=per_page, count=count)
+
+
+def init_report_priority(app):
+    app.extensions['report_priority'] = ReportPriority(
+        app, app.config.get('REPORT_PRIORITY_RESCORE_SECONDS', 900))
+    return app.extensions['report_priority']
+
+
+def get_report_priority():
+    return current_app.extensions['report_priority']
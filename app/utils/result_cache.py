@@ -0,0 +1,103 @@
+"""
+Small in-process caches for search-derived results.
+
+Entries are keyed on a normalized query, expire after a TTL, are evicted
+least recently used first, and the whole cache is dropped whenever
+app.signals.case_changed reports a committed case write in this process.
+The TTL bounds staleness from writes made by other processes.
+
+get_or_compute() is single-flight: under a burst of requests for a cold
+key, one computes the value and the rest wait for it.
+"""
+import threading
+import time
+from collections import OrderedDict
+from app.signals import case_changed
+
+
+def normalize_query(query):
+    """Case- and whitespace-insensitive form of a search query"""
+    return ' '.join((query or '').lower().split())
+
+
+class ResultCache:
+    def __init__(self, app, name, max_entries=1000, ttl=60):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        case_changed.connect(self._on_case_changed, sender=app)
+
+    def _on_case_changed(self, sender, **changes):
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            # Values computed before the clear must not be stored after it
+            self._generation += 1
+
+    @property
+    def generation(self):
+        """Pass to set() so a value computed across a clear() is not stored"""
+        return self._generation
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, generation=None):
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute, wait=10):
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            done = self._inflight.get(key)
+            leader = done is None
+            if leader:
+                done = self._inflight[key] = threading.Event()
+            generation = self._generation
+
+        if not leader:
+            done.wait(wait)
+            value = self.get(key)
+            # The leader failed, timed out or was invalidated: compute it here
+            return value if value is not None else compute()
+
+        try:
+            value = compute()
+            self.set(key, value, generation)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            done.set()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 3) if total else 0.0
+        }
@@ -0,0 +1,213 @@
+"""
+Daily rollups of case, sighting and user activity for the statistics time
+series.
+
+Each metric counts rows by the day of one of their timestamps:
+
+    cases_created         missing_persons.created_at
+    cases_found           missing_persons.found_date
+    cases_closed          missing_persons.closed_at
+    sightings_submitted   sighting_reports.created_at
+    sightings_verified    sighting_reports.verified_at, status verified
+    sightings_rejected    sighting_reports.verified_at, status rejected
+    users_created         users.created_at
+
+The after_flush hook in app.models.events moves rows between (metric, day)
+buckets as they are written, and `flask backfill-rollups` recounts history
+in chunks of days. series() reads ranges at day, week or month granularity
+from daily_rollups alone.
+"""
+from collections import Counter
+from datetime import date, datetime, timedelta
+from sqlalchemy import select, delete, insert, update, func
+from sqlalchemy.dialects import postgresql, sqlite
+from app.extensions import db
+from app.models.stats import DailyRollup
+from app.models.missing_person import MissingPerson
+from app.models.sighting import SightingReport
+from app.models.user import User
+from app.models.options import MissingPersonStatus, ReportStatus
+
+GRANULARITIES = ('day', 'week', 'month')
+# Largest series one request may ask for, per metric
+MAX_BUCKETS = 1000
+
+# metric -> (timestamp column, extra condition or None), for recounting
+ROLLUPS = {
+    'cases_created': (MissingPerson.created_at, None),
+    'cases_found': (MissingPerson.found_date, None),
+    'cases_closed': (MissingPerson.closed_at, None),
+    'sightings_submitted': (SightingReport.created_at, None),
+    'sightings_verified': (SightingReport.verified_at, SightingReport.status == ReportStatus.VERIFIED),
+    'sightings_rejected': (SightingReport.verified_at, SightingReport.status == ReportStatus.REJECTED),
+    'users_created': (User.created_at, None),
+}
+METRICS = tuple(ROLLUPS)
+
+
+def _day(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+def person_rollups(created_at, found_date, closed_at):
+    """(metric, day) buckets a case with these values counts in"""
+    buckets = [('cases_created', _day(created_at))]
+    if found_date is not None:
+        buckets.append(('cases_found', _day(found_date)))
+    if closed_at is not None:
+        buckets.append(('cases_closed', _day(closed_at)))
+    return buckets
+
+
+def report_rollups(created_at, status, verified_at):
+    buckets = [('sightings_submitted', _day(created_at))]
+    if verified_at is not None and status in (ReportStatus.VERIFIED, ReportStatus.REJECTED):
+        buckets.append((f'sightings_{status.value}', _day(verified_at)))
+    return buckets
+
+
+def user_rollups(created_at):
+    return [('users_created', _day(created_at))]
+
+
+def apply_rollup_deltas(connection, deltas):
+    """Add {(metric, day): delta} to the rollups, in the caller's transaction"""
+    rows = [{'metric': metric, 'day': day, 'value': delta}
+            for (metric, day), delta in sorted(deltas.items()) if delta and day is not None]
+    if not rows:
+        return
+
+    table = DailyRollup.__table__
+    dialect = connection.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        upsert = (postgresql if dialect == 'postgresql' else sqlite).insert(table)
+        connection.execute(upsert.on_conflict_do_update(
+            index_elements=[table.c.metric, table.c.day],
+            set_={'value': table.c.value + upsert.excluded.value}
+        ), rows)
+        return
+
+    for row in rows:
+        result = connection.execute(
+            update(table).where(table.c.metric == row['metric'], table.c.day == row['day'])
+            .values(value=table.c.value + row['value'])
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(table), row)
+
+
+def count_rollups(connection, start, end):
+    """{(metric, day): count} recounted from the source tables for start <= day < end"""
+    counts = Counter()
+    low = datetime.combine(start, datetime.min.time())
+    high = datetime.combine(end, datetime.min.time())
+    for metric, (column, condition) in ROLLUPS.items():
+        query = (select(func.date(column), func.count())
+                 .where(column >= low, column < high)
+                 .group_by(func.date(column)))
+        if condition is not None:
+            query = query.where(condition)
+        for day, count in connection.execute(query):
+            counts[metric, date.fromisoformat(day) if isinstance(day, str) else day] += count
+    return counts
+
+
+def history_start(connection):
+    """The earliest day any metric has data for, or None"""
+    days = [connection.execute(select(func.min(column))).scalar() for column, _ in ROLLUPS.values()]
+    days = [_day(day) for day in days if day is not None]
+    return min(days) if days else None
+
+
+def rebuild_rollups(connection, start, end):
+    """Replace the rollups for start <= day < end with a recount. Returns rows written"""
+    table = DailyRollup.__table__
+    counts = count_rollups(connection, start, end)
+    connection.execute(delete(table).where(table.c.day >= start, table.c.day < end))
+    if counts:
+        connection.execute(insert(table), [
+            {'metric': metric, 'day': day, 'value': value} for (metric, day), value in counts.items()
+        ])
+    return len(counts)
+
+
+def rebuild_rollups_spanning(connection, values):
+    """
+    Recount the rollups from the earliest to the latest of the given
+    dates/datetimes, after writes that skipped the flush deltas (bulk
+    saves and deletes). Returns rows written.
+    """
+    days = [_day(value) for value in values if value is not None]
+    if not days:
+        return 0
+    return rebuild_rollups(connection, min(days), max(days) + timedelta(days=1))
+
+
+def stored_rollup_range(connection):
+    """(first day, last day) of the stored rollups, or (None, None)"""
+    table = DailyRollup.__table__
+    return tuple(connection.execute(select(func.min(table.c.day), func.max(table.c.day))).one())
+
+
+def stamp_missing_status_dates(connection):
+    """
+    Give found/closed cases from before found_date/closed_at were always set
+    their last update time, so the rollups can place them. Returns cases stamped.
+    """
+    table = MissingPerson.__table__
+    stamped = 0
+    for status, column in ((MissingPersonStatus.FOUND, table.c.found_date),
+                           (MissingPersonStatus.CLOSED, table.c.closed_at)):
+        stamped += connection.execute(
+            update(table).where(table.c.status == status, column.is_(None))
+            .values({column: func.coalesce(table.c.updated_at, table.c.created_at),
+                     table.c.updated_at: table.c.updated_at})
+        ).rowcount
+    return stamped
+
+
+def bucket_start(day, granularity):
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _next_bucket(day, granularity):
+    if granularity == 'week':
+        return day + timedelta(days=7)
+    if granularity == 'month':
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return day + timedelta(days=1)
+
+
+def bucket_count(start, end, granularity='day'):
+    """Number of buckets series() returns for start..end"""
+    if granularity == 'month':
+        return (end.year - start.year) * 12 + end.month - start.month + 1
+    days = (end - bucket_start(start, granularity)).days
+    return days // 7 + 1 if granularity == 'week' else days + 1
+
+
+def series(metrics, start, end, granularity='day'):
+    """
+    {metric: [(bucket start, count)]} for start <= day <= end, with every
+    bucket of the range present (zero when nothing happened).
+    """
+    rows = db.session.execute(
+        select(DailyRollup.metric, DailyRollup.day, DailyRollup.value)
+        .where(DailyRollup.metric.in_(metrics), DailyRollup.day.between(start, end))
+    ).all()
+
+    totals = Counter()
+    for metric, day, value in rows:
+        totals[metric, bucket_start(day, granularity)] += value
+
+    buckets = []
+    bucket = bucket_start(start, granularity)
+    while bucket <= end:
+        buckets.append(bucket)
+        bucket = _next_bucket(bucket, granularity)
+
+    return {metric: [(bucket, totals[metric, bucket]) for bucket in buckets] for metric in metrics}
@@ -0,0 +1,50 @@
+import threading
+
+
+class PeriodicTask:
+    """
+    Runs func inside an app context every interval seconds on a daemon thread.
+
+    The thread is started lazily by start(), so CLI commands and requests
+    that never need the task do not spawn it. wake() runs the task early.
+    """
+
+    def __init__(self, app, func, interval, name=None):
+        self.app = app
+        self.func = func
+        self.interval = interval
+        self.name = name or func.__name__
+        self._thread = None
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self, run_now=False):
+        """Start the thread if it is not running; run_now runs the task as it starts"""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                if run_now:
+                    self._wake.set()
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stopped.is_set():
+                break
+            with self.app.app_context():
+                try:
+                    self.func()
+                except Exception as e:
+                    self.app.logger.error(f"Periodic task {self.name} failed: {e}", exc_info=True)
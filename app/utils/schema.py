@@ -0,0 +1,27 @@
+"""
+Schema objects created at startup by the search backends rather than by
+migrations: the SQLite FTS5 table (and its shadow tables and triggers),
+the PostgreSQL search_vector column and its GIN index, and the pg_trgm
+indexes. Which of them exist depends on the database and its extensions,
+so install() creates them idempotently.
+
+They have no model counterpart, so `flask db migrate` would generate
+operations dropping them; include_object() is passed to Flask-Migrate to
+keep autogenerate away from them.
+"""
+from app.utils.search import SQLiteFTSSearch, SEARCH_VECTOR_INDEX
+from app.utils.fuzzy import TRGM_COLUMNS, trgm_index_name
+
+RUNTIME_COLUMNS = {('missing_persons', 'search_vector')}
+RUNTIME_INDEXES = {SEARCH_VECTOR_INDEX} | {trgm_index_name(column) for column in TRGM_COLUMNS}
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    """Alembic autogenerate hook: skip the objects the search backends manage"""
+    if type_ == 'table':
+        return not name.startswith(SQLiteFTSSearch.fts_table)
+    if type_ == 'column':
+        return (obj.table.name, name) not in RUNTIME_COLUMNS
+    if type_ == 'index':
+        return name not in RUNTIME_INDEXES
+    return True
@@ -0,0 +1,221 @@
+"""
+Full-text search over missing person cases.
+
+Every case search (main.search, main.browse, api.search_api, the map markers
+and the admin case list) goes through apply_search(), which picks the
+backend installed for the database at startup:
+
+- SQLite: an external-content FTS5 table kept in sync by triggers
+- PostgreSQL: a generated, weighted tsvector column with a GIN index
+- anything else (or SQLite without FTS5): the previous ilike scan
+
+The indexed fields are name, last seen location, case number, distinguishing
+features and clothing. Each word of the query is matched as a prefix and all
+words must match; results can be ordered by rank.
+"""
+import re
+from flask import current_app
+from sqlalchemy import text, or_, func, table, column, literal_column, false, select, desc
+from sqlalchemy.exc import OperationalError
+from app.extensions import db
+from app.models.missing_person import MissingPerson, PersonNameKey
+from app.models.options import MissingPersonStatus
+from app.utils.phonetic import name_keys, name_phonetic
+
+SEARCH_COLUMNS = ('full_name', 'last_seen_location', 'case_number',
+                  'distinguishing_features', 'last_seen_wearing')
+# Relative weight of each column in SEARCH_COLUMNS when ranking
+SEARCH_WEIGHTS = (10.0, 4.0, 10.0, 2.0, 1.0)
+MAX_TERMS = 8
+SEARCH_VECTOR_INDEX = 'ix_missing_persons_search_vector'
+
+
+def search_terms(query):
+    """Split a user query into lowercase word terms, dropping FTS syntax"""
+    return re.findall(r'\w+', (query or '').lower())[:MAX_TERMS]
+
+
+class LikeSearch:
+    """Fallback: substring match over the searchable columns, no ranking"""
+    name = 'like'
+
+    def install(self, connection):
+        return True
+
+    def rebuild(self, connection):
+        pass
+
+    def apply(self, query, raw_query, terms, ranked):
+        pattern = f'%{raw_query.strip()}%'
+        return query.filter(or_(*[
+            getattr(MissingPerson, name).ilike(pattern) for name in SEARCH_COLUMNS
+        ]))
+
+
+class SQLiteFTSSearch(LikeSearch):
+    name = 'sqlite-fts5'
+    fts_table = 'missing_persons_fts'
+
+    def install(self, connection):
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': self.fts_table}
+        ).first()
+        try:
+            connection.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.fts_table} USING fts5("
+                f"{', '.join(SEARCH_COLUMNS)}, content='missing_persons', content_rowid='id', "
+                "tokenize='unicode61 remove_diacritics 2')"
+            ))
+        except OperationalError:
+            # SQLite built without FTS5
+            return False
+
+        columns = ', '.join(SEARCH_COLUMNS)
+        new_values = ', '.join(f'new.{name}' for name in SEARCH_COLUMNS)
+        old_values = ', '.join(f'old.{name}' for name in SEARCH_COLUMNS)
+        insert_new = (f"INSERT INTO {self.fts_table}(rowid, {columns}) "
+                      f"VALUES (new.id, {new_values});")
+        delete_old = (f"INSERT INTO {self.fts_table}({self.fts_table}, rowid, {columns}) "
+                      f"VALUES ('delete', old.id, {old_values});")
+
+        for statement in (
+            f"CREATE TRIGGER IF NOT EXISTS {self.fts_table}_ai AFTER INSERT ON missing_persons "
+            f"BEGIN {insert_new} END",
+            f"CREATE TRIGGER IF NOT EXISTS {self.fts_table}_ad AFTER DELETE ON missing_persons "
+            f"BEGIN {delete_old} END",
+            # Only reindex when a searchable column changes, not on view counts etc.
+            f"CREATE TRIGGER IF NOT EXISTS {self.fts_table}_au AFTER UPDATE OF {columns} "
+            f"ON missing_persons BEGIN {delete_old} {insert_new} END",
+        ):
+            connection.execute(text(statement))
+
+        if not exists:
+            self.rebuild(connection)
+        return True
+
+    def rebuild(self, connection):
+        connection.execute(text(
+            f"INSERT INTO {self.fts_table}({self.fts_table}) VALUES ('rebuild')"
+        ))
+
+    def apply(self, query, raw_query, terms, ranked):
+        if not terms:
+            return query.filter(false())
+        fts = table(self.fts_table, column('rowid'))
+        match = ' '.join(f'"{term}"*' for term in terms)
+        query = query.join(fts, fts.c.rowid == MissingPerson.id).filter(
+            literal_column(self.fts_table).op('MATCH')(match)
+        )
+        if ranked:
+            # bm25 is lower for better matches
+            query = query.order_by(func.bm25(literal_column(self.fts_table), *SEARCH_WEIGHTS))
+        return query
+
+
+class PostgresFTSSearch(LikeSearch):
+    name = 'postgresql-tsvector'
+
+    def install(self, connection):
+        # Weights: A for name/case number, B for location, C features, D clothing
+        vector = ' || '.join(
+            f"setweight(to_tsvector('simple', coalesce({name}, '')), '{weight}')"
+            for name, weight in zip(SEARCH_COLUMNS, 'ABACD')
+        )
+        connection.execute(text(
+            "ALTER TABLE missing_persons ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            f"GENERATED ALWAYS AS ({vector}) STORED"
+        ))
+        connection.execute(text(
+            f"CREATE INDEX IF NOT EXISTS {SEARCH_VECTOR_INDEX} "
+            "ON missing_persons USING gin (search_vector)"
+        ))
+        return True
+
+    def apply(self, query, raw_query, terms, ranked):
+        if not terms:
+            return query.filter(false())
+        vector = literal_column('missing_persons.search_vector')
+        tsquery = func.to_tsquery('simple', ' & '.join(f'{term}:*' for term in terms))
+        query = query.filter(vector.op('@@')(tsquery))
+        if ranked:
+            query = query.order_by(func.ts_rank(vector, tsquery).desc())
+        return query
+
+
+BACKENDS = {
+    'sqlite': SQLiteFTSSearch,
+    'postgresql': PostgresFTSSearch,
+}
+
+
+def init_search(app):
+    """Install the search index for the configured database (idempotent)"""
+    with app.app_context():
+        backend = BACKENDS.get(db.engine.dialect.name, LikeSearch)()
+        with db.engine.begin() as connection:
+            if not backend.install(connection):
+                app.logger.warning(f"Full-text search unavailable ({backend.name}), using ilike search")
+                backend = LikeSearch()
+
+    app.extensions['case_search'] = backend
+    return backend
+
+
+def get_search():
+    return current_app.extensions['case_search']
+
+
+def apply_search(query, raw_query, ranked=True):
+    """
+    Restrict a MissingPerson query to cases matching raw_query.
+
+    With ranked=True the best matches are ordered first; add further
+    order_by() clauses afterwards to break ties.
+    """
+    if not raw_query or not raw_query.strip():
+        return query
+    return get_search().apply(query, raw_query, search_terms(raw_query), ranked)
+
+
+def phonetic_case_ids(raw_query, limit=20):
+    """
+    Ids of public cases whose name sounds like every word of raw_query.
+
+    Uses the indexed person_name_keys table; cases whose whole name key
+    equals the query's come first.
+    """
+    keys = name_keys(raw_query)
+    if not keys:
+        return []
+
+    exact = func.max(MissingPerson.name_phonetic == name_phonetic(raw_query))
+    return db.session.execute(
+        select(PersonNameKey.person_id)
+        .join(MissingPerson, MissingPerson.id == PersonNameKey.person_id)
+        .where(PersonNameKey.key.in_(keys), MissingPerson.is_public == True)
+        .group_by(PersonNameKey.person_id)
+        .having(func.count(func.distinct(PersonNameKey.key)) == len(keys))
+        .order_by(desc(exact), desc(func.max(MissingPerson.created_at)))
+        .limit(limit)
+    ).scalars().all()
+
+
+def possible_duplicates(full_name, viewer, exclude_id=None, limit=5):
+    """
+    Open cases whose whole name sounds the same as full_name: public ones,
+    plus the viewer's own private cases, or every case for an admin
+    """
+    key = name_phonetic(full_name)
+    if not key:
+        return []
+
+    query = MissingPerson.query.filter(
+        MissingPerson.name_phonetic == key,
+        MissingPerson.status == MissingPersonStatus.MISSING
+    )
+    if not viewer.is_admin():
+        query = query.filter(or_(MissingPerson.is_public == True, MissingPerson.reported_by == viewer.id))
+    if exclude_id is not None:
+        query = query.filter(MissingPerson.id != exclude_id)
+    return query.order_by(desc(MissingPerson.created_at)).limit(limit).all()
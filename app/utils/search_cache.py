@@ -0,0 +1,94 @@
+"""
+Search result id cache.
+
+Search routes cache only the ordered ids of a result page (plus the total
+for paginated views) under a key built from the normalized query and the
+filters, then hydrate the rows with a single primary-key IN query. The
+cache is a ResultCache, so it is single-flight and dropped on every
+committed case write. Keyset-paginated lists cache the page keys per
+cursor and the total once per query.
+"""
+from flask import current_app
+from flask_sqlalchemy.pagination import Pagination
+from app.models.missing_person import MissingPerson
+from app.utils.result_cache import ResultCache, normalize_query
+from app.utils.keyset import KeysetPage, keyset_keys
+
+# Most ids the search API returns; it caches this many per query and
+# slices them per request, so the requested limit is not part of the key
+MAX_SEARCH_RESULTS = 100
+
+
+def init_search_cache(app):
+    app.extensions['search_cache'] = ResultCache(
+        app, 'search',
+        max_entries=app.config.get('SEARCH_CACHE_SIZE', 5000),
+        ttl=app.config.get('SEARCH_CACHE_SECONDS', 30)
+    )
+
+
+def get_search_cache():
+    return current_app.extensions['search_cache']
+
+
+def search_key(view, raw_query, *filters):
+    return (view, normalize_query(raw_query)) + tuple(
+        (value or '').strip().lower() if isinstance(value, str) else value for value in filters
+    )
+
+
+def cached_ids(key, compute):
+    """Ordered case ids for key, computing them with compute() on a miss"""
+    return get_search_cache().get_or_compute(key, lambda: list(compute()))
+
+
+def hydrate(ids, query=None):
+    """Load cases by id in one query, in the order of ids, skipping deleted ones"""
+    if not ids:
+        return []
+    query = query if query is not None else MissingPerson.query
+    by_id = {person.id: person for person in query.filter(MissingPerson.id.in_(ids))}
+    return [by_id[case_id] for case_id in ids if case_id in by_id]
+
+
+class CachedPagination(Pagination):
+    """Pagination whose page ids and total come from the search cache"""
+
+    def _query_items(self):
+        return hydrate(self._query_args['ids'], self._query_args['hydrate_query'])
+
+    def _query_count(self):
+        return self._query_args['total']
+
+
+def paginate_cached(query, key, page, per_page, hydrate_query=None):
+    """
+    paginate() for a MissingPerson query, caching the ids of the page and the
+    total under key. Loader options belong on hydrate_query, not on query.
+    """
+    page = max(page or 1, 1)
+
+    def compute():
+        ids = [row[0] for row in query.with_entities(MissingPerson.id)
+               .limit(per_page).offset((page - 1) * per_page)]
+        return ids, query.order_by(None).count()
+
+    ids, total = get_search_cache().get_or_compute(key + (page, per_page), compute)
+    return CachedPagination(page=page, per_page=per_page, error_out=False,
+                            ids=ids, total=total, hydrate_query=hydrate_query)
+
+
+def paginate_keyset_cached(query, key, sort_column, after=None, before=None, per_page=12,
+                           descending=True, hydrate_query=None):
+    """
+    Keyset-paginate a MissingPerson query on (sort_column, id), caching the
+    keys of the page under key and the cursors, and the total under key alone.
+    """
+    cache = get_search_cache()
+    keys, has_next, has_prev = cache.get_or_compute(
+        key + ('keyset', after, before, per_page),
+        lambda: keyset_keys(query, sort_column, MissingPerson.id, after, before, per_page, descending)
+    )
+    total = cache.get_or_compute(key + ('total',), lambda: query.order_by(None).count())
+    items = hydrate([ident for _, ident in keys], hydrate_query)
+    return KeysetPage(items, keys, per_page, has_next, has_prev, total)
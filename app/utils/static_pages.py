@@ -0,0 +1,95 @@
+"""
+Pre-rendered content pages.
+
+Views decorated with @static_page (about, contact, privacy, ...) only
+change between deploys, so init_static_pages() renders each one once at
+startup, as an anonymous visitor, together with gzip (and brotli, when the
+brotli package is installed) variants. Anonymous GETs are then answered from
+memory with ETag and Cache-Control headers, and with 304 when the
+browser's copy is current. There is no Last-Modified: the only date at hand
+is when a worker started, which differs between workers and restarts while
+the content-hash ETag does not. Logged-in users, whose sidebar differs,
+and requests with pending flash messages get the view rendered as usual.
+
+Pages are rendered with g.prerendering set, so base.html leaves out the
+per-visitor CSRF meta tag; nothing on these pages posts a form.
+"""
+import gzip
+import hashlib
+from dataclasses import dataclass
+from functools import wraps
+from typing import Optional
+from flask import current_app, g, request, session, Response
+from flask_login import current_user
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+@dataclass(slots=True, frozen=True)
+class RenderedPage:
+    body: bytes
+    gzip: bytes
+    brotli: Optional[bytes]
+    etag: str
+
+
+def static_page(view):
+    """Serve this view's page pre-rendered to anonymous visitors"""
+    @wraps(view)
+    def wrapper(**view_args):
+        pages = current_app.extensions.get('static_pages', {})
+        page = pages.get(request.endpoint)
+        if (page is None or view_args or request.method != 'GET'
+                or current_user.is_authenticated or '_flashes' in session):
+            return view(**view_args)
+        return _page_response(page)
+
+    wrapper.static_page_view = view
+    return wrapper
+
+
+def _page_response(page):
+    encodings = request.accept_encodings
+    if page.brotli is not None and encodings['br']:
+        body, encoding = page.brotli, 'br'
+    elif encodings['gzip']:
+        body, encoding = page.gzip, 'gzip'
+    else:
+        body, encoding = page.body, None
+
+    response = Response(body, mimetype='text/html')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    # Logged-in users get a different page at the same URL
+    response.vary.update(('Accept-Encoding', 'Cookie'))
+    response.set_etag(f'{page.etag}-{encoding}' if encoding else page.etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config.get('STATIC_PAGE_MAX_AGE', 86400)
+    return response.make_conditional(request)
+
+
+def render_static_page(app, rule, view):
+    with app.test_request_context(rule.rule):
+        g.prerendering = True
+        body = app.make_response(view()).get_data()
+
+    return RenderedPage(
+        body=body,
+        gzip=gzip.compress(body, compresslevel=9, mtime=0),
+        brotli=brotli.compress(body, quality=11) if brotli is not None else None,
+        etag=hashlib.sha256(body).hexdigest()[:32]
+    )
+
+
+def init_static_pages(app):
+    """Render every @static_page view once; call after blueprints are registered"""
+    pages = {}
+    for rule in app.url_map.iter_rules():
+        view = getattr(app.view_functions.get(rule.endpoint), 'static_page_view', None)
+        if view is not None and not rule.arguments and rule.endpoint not in pages:
+            pages[rule.endpoint] = render_static_page(app, rule, view)
+    app.extensions['static_pages'] = pages
+    return pages
@@ -0,0 +1,151 @@
+"""
+Site-wide counters for the home page, statistics pages, admin dashboard and
+map statistics.
+
+Each metric is a row of stat_counters. ORM writes adjust the affected rows
+by +/-1 in the same transaction (see app.models.events), so a page reads
+every count with one SELECT instead of a COUNT per figure. Writes that
+bypass the ORM (bulk UPDATE/DELETE, other tools) are corrected by
+reconcile_stats(), run periodically and by `flask reconcile-stats`.
+
+Metrics:
+    cases, cases.<status>                 every missing person case
+    public_cases, public_cases.<status>   cases shown publicly
+    public_minors.<status>                public cases of minors
+    reports, reports.<status>             sighting reports
+    users
+"""
+from collections import Counter
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import select, update, insert, bindparam, func
+from app.extensions import db
+from app.models.stats import StatCounter
+from app.models.missing_person import MissingPerson
+from app.models.sighting import SightingReport
+from app.models.user import User
+from app.models.options import MissingPersonStatus, ReportStatus
+from app.utils.scheduler import PeriodicTask
+
+ALL_METRICS = (
+    ['cases', 'public_cases', 'reports', 'users']
+    + [f'{prefix}.{status.value}' for prefix in ('cases', 'public_cases', 'public_minors')
+       for status in MissingPersonStatus]
+    + [f'reports.{status.value}' for status in ReportStatus]
+)
+
+
+def person_metrics(status, is_public, is_minor):
+    """Metrics a case with these values counts towards"""
+    status = status.value if status is not None else MissingPersonStatus.MISSING.value
+    metrics = ['cases', f'cases.{status}']
+    if is_public or is_public is None:
+        metrics += ['public_cases', f'public_cases.{status}']
+        if is_minor:
+            metrics.append(f'public_minors.{status}')
+    return metrics
+
+
+def report_metrics(status):
+    status = status.value if status is not None else ReportStatus.PENDING.value
+    return ['reports', f'reports.{status}']
+
+
+def apply_stat_deltas(connection, deltas):
+    """Add {metric: delta} to the counters, in the caller's transaction"""
+    deltas = {metric: delta for metric, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    table = StatCounter.__table__
+    # Same lock order in every transaction
+    connection.execute(
+        update(table)
+        .where(table.c.metric == bindparam('b_metric'))
+        .values(value=table.c.value + bindparam('b_delta'), updated_at=datetime.now()),
+        [{'b_metric': metric, 'b_delta': delta} for metric, delta in sorted(deltas.items())]
+    )
+
+
+def count_stats(connection):
+    """Every metric counted from the source tables"""
+    counts = Counter(dict.fromkeys(ALL_METRICS, 0))
+
+    person = MissingPerson.__table__.c
+    for status, is_public, is_minor, count in connection.execute(
+            select(person.status, person.is_public, person.is_minor, func.count())
+            .group_by(person.status, person.is_public, person.is_minor)):
+        for metric in person_metrics(status, is_public, is_minor):
+            counts[metric] += count
+
+    report = SightingReport.__table__.c
+    for status, count in connection.execute(
+            select(report.status, func.count()).group_by(report.status)):
+        for metric in report_metrics(status):
+            counts[metric] += count
+
+    counts['users'] = connection.execute(select(func.count()).select_from(User.__table__)).scalar()
+    return counts
+
+
+def reconcile_stats():
+    """Recount every metric and overwrite the counters. Returns {metric: (old, new)} for those that drifted"""
+    connection = db.session.connection()
+    table = StatCounter.__table__
+    now = datetime.now()
+    # Write to every counter first: the row locks (the database write lock
+    # on SQLite) make concurrent deltas wait for this transaction, so none
+    # lands between the recount and the overwrite and is lost
+    connection.execute(update(table).values(updated_at=now))
+    stored = dict(connection.execute(select(table.c.metric, table.c.value)).all())
+    counts = count_stats(connection)
+
+    drifted = {metric: (stored.get(metric), value) for metric, value in counts.items()
+               if stored.get(metric) != value}
+    missing = [metric for metric in drifted if metric not in stored]
+    if missing:
+        connection.execute(insert(table), [
+            {'metric': metric, 'value': counts[metric], 'updated_at': now} for metric in missing
+        ])
+    changed = [metric for metric in drifted if metric in stored]
+    if changed:
+        connection.execute(
+            update(table).where(table.c.metric == bindparam('b_metric'))
+            .values(value=bindparam('b_value'), updated_at=now),
+            [{'b_metric': metric, 'b_value': counts[metric]} for metric in changed]
+        )
+    db.session.commit()
+    return drifted
+
+
+class SiteStats:
+    def __init__(self, app, interval=3600):
+        self.app = app
+        self._task = PeriodicTask(app, self.reconcile, interval, name='stats-reconcile')
+
+    def reconcile(self):
+        drifted = reconcile_stats()
+        if drifted:
+            self.app.logger.info(f"Corrected drifted counters: {drifted}")
+        return drifted
+
+    def values(self):
+        """{metric: value} for every metric, in one query"""
+        self._task.start()
+        values = dict.fromkeys(ALL_METRICS, 0)
+        values.update(db.session.execute(select(StatCounter.metric, StatCounter.value)).all())
+        return values
+
+
+def init_stats(app):
+    app.extensions['site_stats'] = SiteStats(app, app.config.get('STATS_RECONCILE_SECONDS', 3600))
+    with app.app_context():
+        # First start, or metrics added since: fill the counters in
+        if db.session.query(StatCounter).count() < len(ALL_METRICS):
+            reconcile_stats()
+    return app.extensions['site_stats']
+
+
+def site_stats():
+    """Every site-wide counter as {metric: value}"""
+    return current_app.extensions['site_stats'].values()
@@ -0,0 +1,302 @@
+"""
+Upload storage backends.
+
+Files are addressed by a storage key relative to the static folder, e.g.
+``uploads/3f/a2/<filename>`` or ``uploads/sightings/3f/a2/<filename>``.
+Keys are sharded into two levels of hash-prefix directories so no single
+directory grows unbounded.
+"""
+import hashlib
+import os
+import shutil
+import threading
+import time
+from flask import current_app
+from app.utils.scheduler import PeriodicTask
+
+UPLOAD_ROOT = 'uploads'
+
+
+def shard_key(filename, category=None):
+    """Build the sharded storage key for an upload"""
+    digest = hashlib.md5(filename.encode('utf-8')).hexdigest()
+    parts = [UPLOAD_ROOT, category, digest[:2], digest[2:4], filename]
+    return '/'.join(part for part in parts if part)
+
+
+def legacy_key(filename, category=None):
+    """Storage key of a file saved before sharding (flat upload directory)"""
+    return '/'.join(part for part in (UPLOAD_ROOT, category, filename) if part)
+
+
+def is_storage_key(value):
+    """Check whether a stored file_path is already a storage key"""
+    return bool(value) and value.startswith(f'{UPLOAD_ROOT}/')
+
+
+def photo_storage_key(file_path, filename, category=None):
+    """Storage key of a photo row, resolving paths saved before sharding"""
+    if is_storage_key(file_path):
+        return file_path
+    return legacy_key(filename, category)
+
+
+class UploadIndex:
+    """
+    Per-process set of stored upload keys.
+
+    Built by a full scan of the backend on a background thread, started on
+    first use and repeated every refresh_interval seconds, so a listing
+    never runs inside a request or a flush and files deleted by other worker
+    processes drop out at the next refresh. Until the first scan finishes,
+    lookups go to the backend. The storage write and delete paths keep the
+    set current in between. Keys missing from it are re-checked against the
+    backend at most once per recheck_interval seconds, which picks up files
+    written by other worker processes.
+    """
+
+    MAX_MISSES = 100000
+
+    def __init__(self, storage, app, recheck_interval=300, refresh_interval=900):
+        self.storage = storage
+        self.recheck_interval = recheck_interval
+        self._keys = None
+        self._misses = {}
+        # (key, stored) writes and deletes made while a scan runs
+        self._changes = None
+        self._lock = threading.Lock()
+        self._task = PeriodicTask(app, self.refresh, refresh_interval, name='upload-index-refresh')
+
+    def refresh(self):
+        """Rescan the backend and swap in the new key set"""
+        with self._lock:
+            self._changes = []
+        try:
+            keys = set(self.storage.iter_keys())
+        except Exception:
+            with self._lock:
+                self._changes = None
+            raise
+
+        with self._lock:
+            # Replay what this process changed while the listing ran
+            for key, stored in self._changes:
+                if stored:
+                    keys.add(key)
+                else:
+                    keys.discard(key)
+            self._changes = None
+            self._keys = keys
+
+    def _record(self, key, stored):
+        with self._lock:
+            if self._keys is not None:
+                if stored:
+                    self._keys.add(key)
+                else:
+                    self._keys.discard(key)
+            if self._changes is not None:
+                self._changes.append((key, stored))
+
+    def add(self, key):
+        self._record(key, True)
+        self._misses.pop(key, None)
+
+    def discard(self, key):
+        self._record(key, False)
+
+    def exists(self, key):
+        keys = self._keys
+        if keys is None:
+            self._task.start(run_now=True)
+            return self.storage.exists(key)
+        if key in keys:
+            return True
+
+        now = time.monotonic()
+        checked_at = self._misses.get(key)
+        if checked_at is not None and now - checked_at < self.recheck_interval:
+            return False
+
+        if self.storage.exists(key):
+            self.add(key)
+            return True
+
+        if len(self._misses) >= self.MAX_MISSES:
+            self._misses.clear()
+        self._misses[key] = now
+        return False
+
+    def __len__(self):
+        return len(self._keys or ())
+
+
+class BaseStorage:
+    """Common bookkeeping for storage backends"""
+
+    index = None
+
+    def _track(self, key, stored):
+        if self.index is not None:
+            if stored:
+                self.index.add(key)
+            else:
+                self.index.discard(key)
+
+    def is_stored(self, key):
+        """Check key existence, answering from the upload index when there is one"""
+        if self.index is None:
+            return self.exists(key)
+        return self.index.exists(key)
+
+
+class LocalStorage(BaseStorage):
+    """Stores uploads below the Flask static folder"""
+
+    def __init__(self, root, base_url):
+        self.root = root
+        self.base_url = base_url.rstrip('/')
+
+    def path(self, key):
+        return os.path.join(self.root, *key.split('/'))
+
+    def save(self, key, stream, content_type=None):
+        """Write a file object to key, returning the stored size in bytes"""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as out:
+            shutil.copyfileobj(stream, out)
+        self._track(key, True)
+        return os.path.getsize(path)
+
+    def import_file(self, src_path, key, content_type=None):
+        """Move a local file into storage"""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(src_path, path)
+        self._track(key, True)
+        return os.path.getsize(path)
+
+    def delete(self, key):
+        self._track(key, False)
+        try:
+            os.remove(self.path(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def exists(self, key):
+        return os.path.isfile(self.path(key))
+
+    def url(self, key):
+        return f'{self.base_url}/{key}'
+
+    def iter_keys(self, prefix=UPLOAD_ROOT):
+        """Yield every stored key below prefix"""
+        base = self.path(prefix)
+        for dirpath, _dirnames, filenames in os.walk(base):
+            rel_dir = os.path.relpath(dirpath, self.root).replace(os.sep, '/')
+            for name in filenames:
+                yield f'{rel_dir}/{name}'
+
+
+class S3Storage(BaseStorage):
+    """
+    Stores uploads in an S3-compatible bucket.
+
+    Point S3_ENDPOINT_URL at a local stand-in (MinIO, moto server) to run
+    against something other than AWS.
+    """
+
+    def __init__(self, bucket, endpoint_url=None, region=None, access_key=None,
+                 secret_key=None, public_url=None):
+        try:
+            import boto3
+            from botocore.exceptions import ClientError
+        except ImportError:
+            raise RuntimeError("boto3 is required for the 's3' upload storage backend")
+
+        self.bucket = bucket
+        self.client = boto3.client(
+            's3',
+            endpoint_url=endpoint_url,
+            region_name=region,
+            aws_access_key_id=access_key,
+            aws_secret_access_key=secret_key
+        )
+        self._client_error = ClientError
+        if public_url:
+            self.base_url = public_url.rstrip('/')
+        elif endpoint_url:
+            self.base_url = f"{endpoint_url.rstrip('/')}/{bucket}"
+        else:
+            self.base_url = f'https://{bucket}.s3.amazonaws.com'
+
+    def save(self, key, stream, content_type=None):
+        extra_args = {'ContentType': content_type} if content_type else None
+        self.client.upload_fileobj(stream, self.bucket, key, ExtraArgs=extra_args)
+        self._track(key, True)
+        head = self.client.head_object(Bucket=self.bucket, Key=key)
+        return head['ContentLength']
+
+    def import_file(self, src_path, key, content_type=None):
+        with open(src_path, 'rb') as src:
+            size = self.save(key, src, content_type)
+        os.remove(src_path)
+        return size
+
+    def delete(self, key):
+        self._track(key, False)
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+        return True
+
+    def exists(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except self._client_error as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+    def url(self, key):
+        return f'{self.base_url}/{key}'
+
+    def iter_keys(self, prefix=UPLOAD_ROOT):
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=f'{prefix}/'):
+            for obj in page.get('Contents', []):
+                yield obj['Key']
+
+
+def init_storage(app):
+    """Create the configured upload storage backend for the app"""
+    backend = app.config.get('UPLOAD_STORAGE_BACKEND', 'local')
+
+    if backend == 's3':
+        storage = S3Storage(
+            bucket=app.config['S3_BUCKET'],
+            endpoint_url=app.config.get('S3_ENDPOINT_URL'),
+            region=app.config.get('S3_REGION'),
+            access_key=app.config.get('S3_ACCESS_KEY_ID'),
+            secret_key=app.config.get('S3_SECRET_ACCESS_KEY'),
+            public_url=app.config.get('S3_PUBLIC_URL')
+        )
+    elif backend == 'local':
+        storage = LocalStorage(app.static_folder, app.static_url_path)
+    else:
+        raise ValueError(f"Unknown UPLOAD_STORAGE_BACKEND: {backend}")
+
+    storage.index = UploadIndex(
+        storage, app,
+        recheck_interval=app.config.get('UPLOAD_INDEX_RECHECK_SECONDS', 300),
+        refresh_interval=app.config.get('UPLOAD_INDEX_REFRESH_SECONDS', 900)
+    )
+
+    app.extensions['upload_storage'] = storage
+    return storage
+
+
+def get_storage():
+    """Return the upload storage backend of the current app"""
+    return current_app.extensions['upload_storage']
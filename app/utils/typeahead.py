@@ -0,0 +1,141 @@
+"""
+Typeahead suggestions for the case search boxes.
+
+Suggestions are served from an in-process sorted array of
+(term, case id) pairs over the words of public case names, locations and
+case numbers, so a keystroke is a bisect plus a short scan and never
+touches the database. The index is kept current through LiveCaseIndex.
+
+Updates never shift the big array: new pairs go into a small sorted
+buffer and removed ones are only dropped from the case map (and skipped
+when scanned). Every MERGE_SIZE changes both are folded into a fresh array
+in one linear merge.
+"""
+import bisect
+import heapq
+import re
+from flask import current_app
+from app.models.missing_person import MissingPerson
+from app.utils.case_index import LiveCaseIndex
+
+MAX_SCAN = 2000
+MAX_SUGGESTIONS = 20
+MERGE_SIZE = 1024
+
+
+def terms(value):
+    return re.findall(r'\w+', (value or '').lower())
+
+
+class PrefixIndex:
+    def __init__(self):
+        self.entries = []
+        self.cases = {}
+        # Pairs added since the last merge, sorted
+        self.recent = []
+        # Pairs in entries/recent whose case was removed or re-added since
+        self.stale = 0
+
+    def __len__(self):
+        return len(self.cases)
+
+    def add(self, row):
+        case_id, full_name, location, case_number = row
+        self.remove(case_id)
+        case_terms = frozenset(terms(full_name) + terms(location) + terms(case_number))
+        self.cases[case_id] = (case_terms, full_name, location, case_number)
+        for term in case_terms:
+            bisect.insort(self.recent, (term, case_id))
+        self._merge_if_due()
+
+    def remove(self, case_id):
+        case = self.cases.pop(case_id, None)
+        if case is None:
+            return
+        self.stale += len(case[0])
+        self._merge_if_due()
+
+    def _live(self, entry):
+        case = self.cases.get(entry[1])
+        return case is not None and entry[0] in case[0]
+
+    def _merge_if_due(self):
+        if len(self.recent) + self.stale < MERGE_SIZE:
+            return
+        # A case removed and re-added has its pairs in both lists: keep one
+        merged = [entry for entry in heapq.merge(self.entries, self.recent) if self._live(entry)]
+        self.entries = [entry for i, entry in enumerate(merged) if i == 0 or merged[i - 1] != entry]
+        self.recent = []
+        self.stale = 0
+
+    def bulk_load(self, rows):
+        """Add many rows with a single sort instead of one insort per term"""
+        entries = []
+        for case_id, full_name, location, case_number in rows:
+            case_terms = frozenset(terms(full_name) + terms(location) + terms(case_number))
+            self.cases[case_id] = (case_terms, full_name, location, case_number)
+            entries.extend((term, case_id) for term in case_terms)
+        entries.sort()
+        self.entries = entries
+        self.recent = []
+        self.stale = 0
+
+    @staticmethod
+    def _range(entries, prefix):
+        return (bisect.bisect_left(entries, (prefix,)),
+                bisect.bisect_left(entries, (prefix + '\uffff',)))
+
+    def suggest(self, query, limit=8):
+        """
+        Cases having, for every query word, a term starting with it.
+        Returns [(id, name, location, case number)].
+        """
+        query_terms = list(dict.fromkeys(terms(query)))
+        if not query_terms:
+            return []
+
+        # Scan the narrowest word's range and check the others per case
+        (start, end), driver = min(
+            ((self._range(self.entries, term), term) for term in query_terms),
+            key=lambda item: item[0][1] - item[0][0]
+        )
+        others = [term for term in query_terms if term != driver]
+        recent_start, recent_end = self._range(self.recent, driver)
+
+        results = []
+        seen = set()
+        for entry in heapq.merge(self.entries[start:min(end, start + MAX_SCAN)],
+                                 self.recent[recent_start:recent_end]):
+            case_id = entry[1]
+            if case_id in seen or not self._live(entry):
+                continue
+            seen.add(case_id)
+
+            case_terms, full_name, location, case_number = self.cases[case_id]
+            if all(any(t.startswith(other) for t in case_terms) for other in others):
+                results.append((case_id, full_name, location, case_number))
+                if len(results) >= limit:
+                    break
+        return results
+
+
+class Typeahead:
+    def __init__(self, app):
+        self.index = LiveCaseIndex(
+            app, PrefixIndex,
+            (MissingPerson.full_name, MissingPerson.last_seen_location, MissingPerson.case_number),
+            name='prefix-index',
+            refresh_interval=app.config.get('CASE_INDEX_REFRESH_SECONDS', 900)
+        )
+
+    def suggest(self, query, limit=8):
+        return self.index.lookup('suggest', query, max(1, min(limit, MAX_SUGGESTIONS)))
+
+
+def init_typeahead(app):
+    app.extensions['typeahead'] = Typeahead(app)
+    return app.extensions['typeahead']
+
+
+def get_typeahead():
+    return current_app.extensions['typeahead']
@@ -0,0 +1,109 @@
+"""
+Indexed user search for the admin users list.
+
+Users carry lowercased copies of their username and email
+(username_lower, email_lower) and one user_name_tokens row per word of
+their full name, all kept current by the ORM hooks in app.models.events.
+A search is then a handful of index lookups instead of a %q% scan of
+users:
+
+    an email address     exact match on email_lower
+    anything else        username_lower starting with the query, or every
+                         word of the query starting a token of the full name
+
+Prefixes are matched as ranges (col >= 'wan' AND col < 'wan' + MAX_CHAR)
+so every database uses the plain b-tree index.
+"""
+import re
+import unicodedata
+from sqlalchemy import select, update, delete, insert, bindparam, and_, or_, false
+from app.extensions import db
+from app.models.user import User, UserNameToken
+
+MAX_CHAR = '\U0010ffff'
+MAX_TOKEN_LENGTH = 64
+
+
+def normalize(text):
+    """Lowercase, accent-free, whitespace-collapsed form of a search text; other scripts are kept"""
+    text = ''.join(char for char in unicodedata.normalize('NFKD', text or '')
+                   if not unicodedata.combining(char))
+    return ' '.join(unicodedata.normalize('NFC', text).lower().split())
+
+
+def name_tokens(name):
+    """Distinct normalized words of a name"""
+    return sorted({word[:MAX_TOKEN_LENGTH] for word in re.findall(r'\w+', normalize(name))})
+
+
+def prefix_match(column, prefix):
+    """Index range condition for column values starting with prefix"""
+    return and_(column >= prefix, column < prefix + MAX_CHAR)
+
+
+def user_search_filter(query):
+    """WHERE condition for the users matching a search text, or None for a blank one"""
+    if not (query or '').strip():
+        return None
+    text = normalize(query)
+    if not text:
+        # Only marks or other characters normalized away: nothing can match
+        return false()
+    if '@' in text:
+        return User.email_lower == text
+
+    token_matches = [
+        User.id.in_(select(UserNameToken.user_id).where(prefix_match(UserNameToken.token, word)))
+        for word in name_tokens(text)
+    ]
+    conditions = [prefix_match(User.username_lower, text)]
+    if token_matches:
+        conditions.append(and_(*token_matches))
+    return or_(*conditions)
+
+
+def refresh_user_tokens(connection, names, deleted_ids=()):
+    """Rewrite the name tokens of {user id: full_name}; tokens of deleted_ids are dropped"""
+    user_ids = set(names) | set(deleted_ids)
+    if not user_ids:
+        return
+
+    table = UserNameToken.__table__
+    connection.execute(delete(table).where(table.c.user_id.in_(user_ids)))
+    rows = [{'user_id': uid, 'token': token} for uid, name in names.items() for token in name_tokens(name)]
+    if rows:
+        connection.execute(insert(table), rows)
+
+
+def backfill_user_search(batch_size=1000):
+    """
+    Fill username_lower, email_lower and the name tokens of every user,
+    batch_size users per transaction. Returns the number of users.
+    """
+    table = User.__table__
+    done = 0
+    last_id = 0
+
+    while True:
+        rows = db.session.execute(
+            select(table.c.id, table.c.username, table.c.email, table.c.full_name)
+            .where(table.c.id > last_id).order_by(table.c.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        connection = db.session.connection()
+        connection.execute(
+            update(table).where(table.c.id == bindparam('b_id'))
+            .values(updated_at=table.c.updated_at,
+                    username_lower=bindparam('b_username'), email_lower=bindparam('b_email')),
+            [{'b_id': row.id, 'b_username': normalize(row.username), 'b_email': normalize(row.email)}
+             for row in rows]
+        )
+        refresh_user_tokens(connection, {row.id: row.full_name for row in rows})
+        db.session.commit()
+        done += len(rows)
+
+    return done
+
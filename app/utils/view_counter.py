@@ -0,0 +1,100 @@
+"""
+Buffered view counting for missing person pages.
+
+Views are accumulated in memory and written as one batched UPDATE
+(view_count = view_count + delta) per flush, instead of a commit per page
+view. Because the update is additive, each worker process flushing its own
+buffer never loses increments made by another.
+"""
+import atexit
+import threading
+from collections import Counter
+from flask import current_app
+from sqlalchemy import update, bindparam
+from app.extensions import db
+from app.utils.scheduler import PeriodicTask
+
+
+class ViewCounter:
+    def __init__(self, app, interval=30, threshold=500):
+        self.app = app
+        self.threshold = threshold
+        self._pending = Counter()
+        # sum(self._pending.values()), kept as views come in
+        self._total = 0
+        self._lock = threading.Lock()
+        self._task = PeriodicTask(app, self.flush, interval, name='view-counter-flush')
+
+    def increment(self, person_id, amount=1):
+        with self._lock:
+            self._pending[person_id] += amount
+            self._total += amount
+            total = self._total
+
+        self._task.start()
+        if total >= self.threshold:
+            self._task.wake()
+
+    def pending(self, person_id):
+        """Views recorded in this process but not flushed yet"""
+        return self._pending.get(person_id, 0)
+
+    def total(self, person_id, view_count):
+        """A stored view_count plus the views of it not flushed yet"""
+        return (view_count or 0) + self.pending(person_id)
+
+    def flush(self):
+        """Write all pending views in one batched UPDATE. Returns rows touched"""
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            total, self._total = self._total, 0
+
+        if not pending:
+            return 0
+
+        from app.models.missing_person import MissingPerson
+        table = MissingPerson.__table__
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam('b_id'))
+            .values(view_count=table.c.view_count + bindparam('b_delta'),
+                    updated_at=table.c.updated_at)
+        )
+
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(stmt, [
+                    {'b_id': person_id, 'b_delta': delta}
+                    for person_id, delta in pending.items()
+                ])
+        except Exception:
+            # Put the views back so the next flush retries them
+            with self._lock:
+                self._pending.update(pending)
+                self._total += total
+            raise
+
+        return len(pending)
+
+    def _flush_at_exit(self):
+        self._task.stop()
+        with self.app.app_context():
+            try:
+                self.flush()
+            except Exception as e:
+                self.app.logger.error(f"Could not flush view counts at shutdown: {e}")
+
+
+def init_view_counter(app):
+    counter = ViewCounter(
+        app,
+        interval=app.config.get('VIEW_COUNT_FLUSH_INTERVAL', 30),
+        threshold=app.config.get('VIEW_COUNT_FLUSH_THRESHOLD', 500)
+    )
+    atexit.register(counter._flush_at_exit)
+    app.extensions['view_counter'] = counter
+    return counter
+
+
+def get_view_counter():
+    return current_app.extensions['view_counter']
@@ -0,0 +1,4 @@
+import os
+
+# app.config refuses to import without one
+os.environ.setdefault('SECRET_KEY', 'test')
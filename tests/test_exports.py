@@ -0,0 +1,29 @@
+import csv
+import io
+import json
+from app.utils.exports import _encode_rows
+
+COLUMNS = ['id', 'description', 'latitude']
+ROWS = [
+    (1, '=HYPERLINK("http://evil","click")', -1.29),
+    (2, '@SUM(A1:A2)', None),
+    (3, 'Seen near the market', 36.82),
+]
+
+
+def test_csv_formula_cells_are_neutralised():
+    data = list(csv.reader(io.StringIO(''.join(_encode_rows(ROWS, COLUMNS, 'csv')))))
+
+    assert data[0] == COLUMNS
+    assert data[1][1] == '\'=HYPERLINK("http://evil","click")'
+    assert data[2][1] == "'@SUM(A1:A2)"
+    assert data[3][1] == 'Seen near the market'
+    # Numbers are not text cells
+    assert data[1][2] == '-1.29'
+    assert not any(row[1].startswith(('=', '+', '-', '@')) for row in data[1:])
+
+
+def test_ndjson_is_unchanged():
+    lines = ''.join(_encode_rows(ROWS, COLUMNS, 'ndjson')).splitlines()
+
+    assert json.loads(lines[0])['description'] == '=HYPERLINK("http://evil","click")'